@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compare rendering of sharded SQL migration per shard with compiled MigrationTemplate.
+
+Run from src directory:
+    python benchmarks/bench_shard_template.py --shards 1024 --statements 1000
+"""
+import argparse
+
+from common import baseline_env_query, baseline_shard_query, baseline_split_sql, load_sdbmigrate, measure
+
+sdbmigrate = load_sdbmigrate()
+
+
+def make_migration(statements):
+    code = "\n".join(
+        "CREATE TABLE IF NOT EXISTS test_{i}_<shard_id> (\n"
+        "    id bigint,\n"
+        "    region int DEFAULT <region_id>\n"
+        ");".format(i=i)
+        for i in range(statements)
+    )
+    return sdbmigrate.Migration(
+        version=0, type1="TRX", type2="SHARD", full_name="V0000__TRX_SHARD__bench.sql", lang="sql", code=code
+    )
+
+
+def make_db(shards):
+    db_config = {
+        "host": "localhost", "name": "bench", "port": 5432, "user": "", "password": "", "type": "postgres",
+    }
+    db = sdbmigrate.DbSession(db_config, 0, shard_ids=list(range(shards)))
+    db.env = {"region_id": {"value": 2, "type": "int"}}
+    return db
+
+
+def render_per_shard(migration, db):
+    """The way sharded migrations were rendered before MigrationTemplate"""
+    count = 0
+    for shard_id in db.shard_ids:
+        migration_code_with_env = baseline_env_query(migration.code, db.env)
+        for sql_chunk in baseline_split_sql(migration_code_with_env):
+            sql = baseline_env_query(sql_chunk, {"db_schema": {"value": db.schema}})
+            baseline_shard_query(sql, shard_id)
+            count += 1
+    return count
+
+
+def render_compiled(migration, db):
+    count = 0
+    for shard_id in db.shard_ids:
+        for _sql_chunk in migration.compile(db).render(shard_id):
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--statements", type=int, default=200)
+    args = parser.parse_args()
+
+    db = make_db(args.shards)
+    compiled = measure("compiled template", render_compiled, make_migration(args.statements), db)
+    per_shard = measure("per shard", render_per_shard, make_migration(args.statements), db)
+    print("speedup: {:.1f}x".format(per_shard / compiled))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Measure overhead of sdbmigrate itself on synthetic migrations, without database servers.
+
+Statements are executed by in-process fake driver(see fake_dbapi.py), so the results show
+time spent in loading, parsing, templating and planning of migrations.
+
+Run from src directory:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --scenario apply --shards 4096 --databases 4 --latency 0.0005
+    python benchmarks/bench_suite.py --scenario apply --jobs 4 -- --batch-statements 50
+"""
+import argparse
+import logging
+import os
+import tempfile
+
+import yaml
+
+from common import baseline_env_query, baseline_shard_query, load_sdbmigrate, measure
+from fake_dbapi import FakeServer
+
+sdbmigrate = load_sdbmigrate()
+
+SCENARIOS = ("load", "split", "template", "apply")
+
+ENV = {"region_id": {"value": 2, "type": "int"}}
+
+PROCEDURE = """
+CREATE OR REPLACE FUNCTION proc_{i}(p_id bigint, p_name text) RETURNS bigint AS $$
+DECLARE
+    v_count bigint;
+BEGIN
+    -- statement separators inside of function body; must not split it
+    SELECT count(*) INTO v_count FROM items WHERE id = p_id AND name = 'a;b';
+    UPDATE items SET name = p_name WHERE id = p_id;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SHARD_STATEMENT = """
+CREATE TABLE IF NOT EXISTS items_{i}_<shard_id> (
+    id bigint PRIMARY KEY,
+    region int DEFAULT <region_id>,
+    name text
+);
+"""
+
+
+def write_file(path, content):
+    with open(path, mode="w", encoding="utf8") as f:
+        f.write(content)
+
+
+def make_migrations_dir(path, files, shard_statements=5):
+    """Mix of migration types, two of every 10 migrations are sharded.
+    Versions have 4 digits, so there may be up to 10000 files.
+    """
+    for version in range(files):
+        if version % 10 == 5:
+            name = "V{:04d}__NOTRX_SHARD__index_{}.sql".format(version, version)
+            content = "CREATE INDEX IF NOT EXISTS items_{0}_idx ON items_<shard_id> (name);".format(version)
+        elif version % 10 == 9:
+            name = "V{:04d}__TRX_SHARD__tables_{}.sql".format(version, version)
+            content = "".join(SHARD_STATEMENT.format(i=i) for i in range(shard_statements))
+        else:
+            name = "V{:04d}__TRX_PLAIN__plain_{}.sql".format(version, version)
+            content = "CREATE TABLE IF NOT EXISTS plain_{0} (id bigint);\nSELECT {0};\n".format(version)
+        write_file(os.path.join(path, name), content)
+
+
+def make_procedures(size_mb):
+    chunks = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        chunks.append(PROCEDURE.format(i=len(chunks)))
+        size += len(chunks[-1])
+    return "".join(chunks)
+
+
+def make_db(shards):
+    db_config = {
+        "host": "localhost", "name": "bench", "port": 5432, "user": "", "password": "", "type": "postgres",
+    }
+    db = sdbmigrate.DbSession(db_config, 0, shard_ids=list(range(shards)))
+    db.env = ENV
+    return db
+
+
+def bench_load(args, workdir):
+    path = os.path.join(workdir, "load")
+    os.mkdir(path)
+    make_migrations_dir(path, args.files)
+    measure("load_migrations", lambda: len(sdbmigrate.load_migrations(path)), unit="files")
+    migrations = sdbmigrate.load_migrations(path)
+    measure("read migrations", lambda: sum(1 for m in migrations if m.code is not None), unit="files")
+
+
+def bench_split(args, _workdir):
+    sql = make_procedures(args.procedure_mb)
+    for splitter in (sdbmigrate.SQL_SPLITTER_BUILTIN, sdbmigrate.SQL_SPLITTER_SQLPARSE):
+        measure(
+            "split_sql {} {}MB".format(splitter, args.procedure_mb),
+            lambda splitter=splitter: len(sdbmigrate.split_sql(sql, splitter=splitter)),
+        )
+
+
+def bench_template(args, _workdir):
+    db = make_db(args.shards)
+    code = "".join(SHARD_STATEMENT.format(i=i) for i in range(args.shard_statements))
+    statements = sdbmigrate.split_sql(baseline_env_query(code, db.env))
+    env = {"var_{}".format(i): {"value": i} for i in range(100)}
+    env.update(db.env)
+
+    def env_query():
+        # replace of every variable, the way migrations were rendered before SqlTemplate
+        for _shard_id in db.shard_ids:
+            baseline_env_query(code, env)
+        return len(db.shard_ids)
+
+    def sql_template():
+        # tokenized once, rendering doesn't depend on number of variables
+        template = sdbmigrate.SqlTemplate(code)
+        values = {key: str(var["value"]) for key, var in env.items()}
+        for _shard_id in db.shard_ids:
+            template.render(values)
+        return len(db.shard_ids)
+
+    def shard_query():
+        count = 0
+        for shard_id in db.shard_ids:
+            for statement in statements:
+                baseline_shard_query(statement, shard_id)
+                count += 1
+        return count
+
+    def compiled():
+        migration = sdbmigrate.Migration(
+            version=0, type1="TRX", type2="SHARD", full_name="V0000__TRX_SHARD__bench.sql",
+            lang="sql", code=code,
+        )
+        return sum(1 for shard_id in db.shard_ids for _ in migration.compile(db).render(shard_id))
+
+    measure("env_query 100 variables", env_query, unit="queries")
+    measure("SqlTemplate 100 variables", sql_template, unit="queries")
+    measure("shard_query", shard_query)
+    measure("MigrationTemplate", compiled)
+
+
+def bench_apply(args, workdir):
+    migrations_dir = os.path.join(workdir, "apply")
+    os.mkdir(migrations_dir)
+    make_migrations_dir(migrations_dir, args.apply_files, args.shard_statements)
+
+    shard_on_db = args.shards // args.databases
+    config = {
+        "shard_count": shard_on_db * args.databases,
+        "shard_distribution_mode": "auto",
+        "shard_on_db": shard_on_db,
+        "env": ENV,
+        "share_mysql_connections": args.share_mysql_connections,
+        "databases": [
+            {
+                "name": "bench_{}".format(index), "host": "localhost", "port": 5432,
+                "type": args.db_type, "user": "", "password": "",
+            }
+            for index in range(args.databases)
+        ],
+    }
+    config_path = os.path.join(workdir, "sdbmigrate.yaml")
+    write_file(config_path, yaml.dump(config))
+
+    server = FakeServer(sdbmigrate, latency=args.latency)
+    sdbmigrate.connect = server.connect
+    sdbmigrate_args = args.sdbmigrate_args[1:] if args.sdbmigrate_args[:1] == ["--"] else args.sdbmigrate_args
+    cli_args = sdbmigrate.create_argument_parser().parse_args(
+        ["-c", config_path, "-d", migrations_dir, "--jobs", str(args.jobs)] + sdbmigrate_args
+    )
+
+    def run():
+        sdbmigrate_config = sdbmigrate.load_sdbmigrate_config(config_path)
+        migrations = sdbmigrate.load_migrations(migrations_dir)
+        db_wrapper = sdbmigrate.DbWrapper(cli_args, sdbmigrate_config)
+        db_wrapper.init_sdbmigrate_state()
+        statements = server.statements
+        sdbmigrate.apply_migrations({"args": cli_args, "db_wrapper": db_wrapper, "timings": None}, migrations)
+        return server.statements - statements
+
+    measure("apply {} shards".format(config["shard_count"]), run)
+    measure("apply up to date", run)
+    print("connections: {}, statements: {}".format(server.connections, server.statements))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="By default all are run")
+    parser.add_argument("--files", type=int, default=10000, help="Migrations for load scenario")
+    parser.add_argument("--procedure-mb", type=int, default=4, help="Size of SQL file for split scenario")
+    parser.add_argument("--shards", type=int, default=4096)
+    parser.add_argument("--shard-statements", type=int, default=20, help="Statements of sharded migration")
+    parser.add_argument("--apply-files", type=int, default=50, help="Migrations for apply scenario")
+    parser.add_argument("--databases", type=int, default=4)
+    parser.add_argument("--db-type", choices=("postgres", "mysql"), default="postgres")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated round trip of statement")
+    parser.add_argument(
+        "--share-mysql-connections", action="store_true",
+        help="All fake MySQL databases are on one server and share its connections",
+    )
+    parser.add_argument(
+        "sdbmigrate_args", nargs=argparse.REMAINDER,
+        help="Extra arguments of sdbmigrate.py for apply scenario, after --",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    benchmarks = {"load": bench_load, "split": bench_split, "template": bench_template, "apply": bench_apply}
+    with tempfile.TemporaryDirectory(prefix="sdbmigrate-bench-") as workdir:
+        for scenario in args.scenario or SCENARIOS:
+            benchmarks[scenario](args, workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Helpers shared by benchmarks, they are run from src directory."""
+import importlib.util
+import os
+import time
+
+import sqlparse
+
+SDBMIGRATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bin", "sdbmigrate.py")
+
+
+def load_sdbmigrate():
+    """bin/sdbmigrate.py is a script, not a package, so it's loaded by path"""
+    spec = importlib.util.spec_from_file_location("sdbmigrate", SDBMIGRATE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# rendering of migrations by sdbmigrate before SqlTemplate and MigrationTemplate,
+# it's the baseline of benchmarks
+def baseline_shard_query(sql_template, shard_id):
+    return sql_template.replace("<shard_id>", str(shard_id))
+
+
+def baseline_env_query(sql_template, env):
+    for key, var in env.items():
+        # use all all variables from env as SQL template variables
+        sql_template = sql_template.replace("<{}>".format(key), str(var["value"]))
+    return sql_template
+
+
+def baseline_split_sql(sql):
+    return [chunk for chunk in sqlparse.split(sql) if chunk != ""]
+
+
+def measure(name, func, *args, unit="statements"):
+    started = time.perf_counter()
+    count = func(*args)
+    elapsed = time.perf_counter() - started
+    print("{:<28} {:>10} {:<10} {:>10.3f}s".format(name, count, unit, elapsed))
+    return elapsed
@@ -0,0 +1,243 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In-process fake DB-API driver for benchmarks of sdbmigrate without database servers.
+
+FakeServer keeps only sdbmigrate state tables(_sdbmigrate_*), all other statements
+are just counted. Its connect() has the same signature as sdbmigrate.connect and returns
+native sdbmigrate connection wrappers, so everything above the driver is measured as is.
+"""
+import json
+import re
+import threading
+import time
+
+STATE_TABLE_RE = re.compile(r"\b(_sdbmigrate_\w+)")
+
+
+class FakeCursor:
+    """DB-API 2.0 cursor which understands queries sdbmigrate uses for its own state"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._rows = []
+
+    def execute(self, query, args=None):
+        server = self.connection.server
+        if server.latency:
+            time.sleep(server.latency)
+        self._rows = server.execute(self.connection.dbname, query, args or {})
+        self.rowcount = len(self._rows)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return list(self._rows)
+
+    @staticmethod
+    def nextset():
+        # results of batched statements are not kept
+        return None
+
+
+class FakeConnection:
+    """Connection with transaction control of both psycopg2 and MySQLdb"""
+
+    def __init__(self, server, dbname):
+        self.server = server
+        self.dbname = dbname
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakePostgresConnection(FakeConnection):
+    """Connection with psycopg2 autocommit attribute"""
+
+    def __init__(self, server, dbname):
+        super().__init__(server, dbname)
+        self.autocommit = False
+
+
+class FakeMysqlConnection(FakeConnection):
+    """Connection with MySQLdb methods for switching database and autocommit mode"""
+
+    def select_db(self, dbname):
+        self.server.add_database(dbname, self.server.sdbmigrate.DB_TYPE_MYSQL)
+        self.dbname = dbname
+
+    def autocommit(self, on):
+        pass
+
+
+class FakeServer:
+    """Keeps sdbmigrate state of all fake databases and counts executed statements"""
+
+    def __init__(self, sdbmigrate, latency=0.0):
+        """
+        :param sdbmigrate: loaded bin/sdbmigrate.py module
+        :param latency: seconds of simulated network round trip for every statement
+        """
+        self.sdbmigrate = sdbmigrate
+        self.latency = latency
+        self.statements = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._databases = {}
+
+    def _database(self, dbname, db_type=None):
+        return self._databases.setdefault(
+            dbname, {
+                "type": db_type, "tables": set(), "sharding": None, "migrations": [], "env": {},
+                "shard_progress": set(),
+            }
+        )
+
+    def add_database(self, dbname, db_type):
+        with self._lock:
+            self._database(dbname, db_type)
+
+    def connect(
+        self, db_info, log=None, autocommit=False, multi_statements=False, timings=None, local_infile=False,
+    ):
+        # pylint: disable=unused-argument
+        with self._lock:
+            self.connections += 1
+        self.add_database(db_info["name"], db_info["type"])
+        if db_info["type"] == self.sdbmigrate.DB_TYPE_POSTGRES:
+            connection = FakePostgresConnection(self, db_info["name"])
+            connection.autocommit = autocommit
+            return self.sdbmigrate.PostgresConnectionWrapper(connection, log, timings)
+        connection = FakeMysqlConnection(self, db_info["name"])
+        return self.sdbmigrate.MysqlConnectionWrapper(
+            connection, log, autocommit, timings, schema=db_info["name"]
+        )
+
+    def execute(self, dbname, query, args):  # pylint: disable=too-many-return-statements
+        with self._lock:
+            self.statements += 1
+            database = self._database(dbname)
+            if "information_schema.tables" in query:
+                # tables are always created with all columns
+                return [(name, ) for name in args["table_names"] if name in database["tables"]] + [
+                    (name, ) for name in args["column_names"] if name.split(".")[0] in database["tables"]
+                ]
+            if "_sdbmigrate_" not in query:
+                return []
+
+            query = " ".join(query.split())
+            table = STATE_TABLE_RE.search(query).group(1)
+            if "UNION ALL" in query:
+                rows = []
+                if database["sharding"] is not None:
+                    shard_count, shard_ids = database["sharding"]
+                    rows.append(("sharding", str(shard_count), json.dumps(shard_ids), None))
+                rows.extend(
+                    ("migration", str(version), name, checksum)
+                    for version, name, checksum in database["migrations"]
+                )
+                rows.extend(
+                    ("env", key, value, var_type) for key, (value, var_type) in database["env"].items()
+                )
+                return rows
+            if query.startswith("CREATE TABLE"):
+                database["tables"].add(table)
+                return []
+            if query.startswith("SELECT count(*)"):
+                if table == "_sdbmigrate_env":
+                    return [(len(database["env"]), )]
+                return [(int(database["sharding"] is not None), )]
+            if query.startswith("INSERT"):
+                self._insert(database, table, args)
+                return []
+            if table == "_sdbmigrate_shard_progress":
+                return self._shard_progress(database, query, args)
+            if table == "_sdbmigrate_sharding_state":
+                if database["sharding"] is None:
+                    return []
+                shard_count, shard_ids = database["sharding"]
+                # MySQLdb returns JSON columns as strings, psycopg2 decodes them
+                if database["type"] == self.sdbmigrate.DB_TYPE_MYSQL:
+                    shard_ids = json.dumps(shard_ids)
+                return [(shard_count, shard_ids)]
+            if table == "_sdbmigrate_migrations":
+                return sorted(database["migrations"])
+            return sorted((key, value, var_type) for key, (value, var_type) in database["env"].items())
+
+    @staticmethod
+    def _shard_progress(database, query, args):
+        if query.startswith("DELETE"):
+            database["shard_progress"] = {
+                (version, shard_id) for version, shard_id in database["shard_progress"]
+                if version != args["version"]
+            }
+            return []
+        return [
+            (shard_id, ) for version, shard_id in database["shard_progress"] if version == args["version"]
+        ]
+
+    @staticmethod
+    def _insert(database, table, args):
+        if table == "_sdbmigrate_shard_progress":
+            database["shard_progress"].update(
+                (args["version"], value) for key, value in args.items() if key.startswith("shard_id_")
+            )
+        elif table == "_sdbmigrate_sharding_state":
+            database["sharding"] = (args["shard_count"], json.loads(args["shard_ids"]))
+        elif table == "_sdbmigrate_env":
+            database["env"][args["key"]] = (str(args["value"]), args["type"])
+        elif "version" in args:
+            database["migrations"].append((args["version"], args["migration_name"], args["checksum"]))
+        else:
+            index = 0
+            while "version_{}".format(index) in args:
+                database["migrations"].append(
+                    (
+                        args["version_{}".format(index)],
+                        args["migration_name_{}".format(index)],
+                        args["checksum_{}".format(index)],
+                    )
+                )
+                index += 1
@@ -18,18 +18,37 @@
 Available actions(specified by --action or -a):
 apply    -- run set of migration on target databases according to config;
 generate -- create next basic migration from the template and
-            put to directory with migrations.
+            put to directory with migrations;
+status   -- print pending migrations of every database as JSON,
+            nothing is written to databases.
 
 """
+# sdbmigrate is installed as a single script(see setup.py), so it can't be split into modules
+# pylint: disable=too-many-lines
 import sys
 import argparse
+import asyncio
+import functools
 import logging
 import pprint
 import os
 import re
 import copy
+import csv
+import hashlib
+import heapq
+import importlib.util
 import json
-from contextlib import contextmanager
+import marshal
+import math
+import queue
+import random
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 
 import yaml
 
@@ -50,9 +69,72 @@ LOG_LEVELS = {
 
 MIGRATION_LANG_SQL = "sql"
 MIGRATION_LANG_PYTHON = "py"
+MIGRATION_LANG_CSV = "csv"
+
+# the first line of CSV migration names the table, the second one is CSV header with columns
+CSV_TABLE_DIRECTIVE = "# table:"
+CSV_TABLE_RE = re.compile(r"^[A-Za-z_]\w*(\.[A-Za-z_]\w*)?$")
+CSV_COLUMN_RE = re.compile(r"^[A-Za-z_]\w*$")
+# number of LOAD DATA warnings shown in error of CSV migration
+CSV_MAX_REPORTED_WARNINGS = 5
 
 DB_TYPE_POSTGRES = "postgres"
 DB_TYPE_MYSQL = "mysql"
+# drivers of PostgreSQL, `driver` of database in config
+POSTGRES_DRIVER_PSYCOPG2 = "psycopg2"
+POSTGRES_DRIVER_PSYCOPG = "psycopg"
+POSTGRES_DRIVERS = (POSTGRES_DRIVER_PSYCOPG2, POSTGRES_DRIVER_PSYCOPG)
+
+# connection settings which may be specified both for all databases
+# on top level of config and for every database separately
+DB_CONNECTION_TIMEOUT_SETTINGS = ("connect_timeout", "read_timeout")
+DB_TIMEOUT_SETTINGS = DB_CONNECTION_TIMEOUT_SETTINGS + ("lock_timeout", )
+# errors of statements which waited for lock longer than lock_timeout
+POSTGRES_LOCK_NOT_AVAILABLE = "55P03"
+MYSQL_LOCK_WAIT_TIMEOUT = 1205
+# statements which leave INVALID index on PostgreSQL after lock timeout, so their retry
+# fails with "already exists" or succeeds by IF NOT EXISTS on top of the invalid index
+LOCK_RETRY_UNSAFE_RE = re.compile(
+    r"^\s*(?:(?:--[^\n]*(?:\n|$)|/\*.*?\*/)\s*)*"
+    r"(?:CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY|REINDEX\b[^;]*?\bCONCURRENTLY)\b",
+    re.IGNORECASE | re.DOTALL,
+)
+LOCK_RETRY_MAX_DELAY = 60
+# default of --lock-retries for databases with lock_timeout in config
+DEFAULT_LOCK_RETRIES = 3
+MAX_CONNECT_WORKERS = 32
+
+SHARD_ID_PLACEHOLDER = "<shard_id>"
+DB_SCHEMA_VARIABLE = "db_schema"
+# <name> of env variable, schema or shard in SQL
+SQL_PLACEHOLDER_RE = re.compile(r"<([A-Za-z_]\w*)>")
+# longer <...> split between chunks of streamed migration is not a placeholder
+SQL_PLACEHOLDER_MAX_LENGTH = 256
+
+SQL_SPLITTER_BUILTIN = "builtin"
+SQL_SPLITTER_SQLPARSE = "sqlparse"
+# it's a part of parse cache keys, so it should be changed with every change of split rules
+SQL_SPLITTER_VERSION = "1"
+SQL_TOKEN_RE = re.compile(
+    r"(?P<newline>\r\n|\r|\n)"
+    r"|(?P<space>[^\S\r\n]+)"
+    r"|(?P<line_comment>(?:--|# )[^\r\n]*(?:\r\n|\r|\n)?)"
+    r"|(?P<word>\w+)"
+    r"|(?P<string>'(?:[^'\\]+|\\.|'')*'?|\"(?:[^\"]+|\"\")*\"?|`(?:[^`]+|``)*`?)"
+    r"|(?P<dollar>\$(?:[^\W\d]\w*)?\$)"
+    r"|(?P<other>[^\w\s'\"`$;()/#-]+|.)",
+    re.DOTALL,
+)
+# PLAIN SQL migrations larger than --stream-sql-min-size are read by chunks of this size
+SQL_STREAM_CHUNK_SIZE = 1024 * 1024
+SQL_DOLLAR_PREFIX_RE = re.compile(r"\$(?:[^\W\d]\w*)?")
+# words after END which close control structure of stored procedure, not BEGIN block
+SQL_END_SUFFIXES = ("IF", "LOOP", "WHILE", "REPEAT", "FOR", "CASE")
+
+ENGINE_THREADS = "threads"
+ENGINE_ASYNCIO = "asyncio"
+ON_ERROR_FAIL_FAST = "fail-fast"
+ON_ERROR_CONTINUE = "continue"
 
 
 class SdbMigrateError(Exception):
@@ -71,6 +153,309 @@ class SdbInvalidEnv(SdbInvalidConfig):
     """Migration error because of invalid sdbmigrate env"""
 
 
+class SdbInvalidData(SdbMigrateError):
+    """Migration error because of invalid rows of CSV migration"""
+
+
+class SdbConnectionError(SdbMigrateError):
+    """Migration error because of unavailable databases"""
+
+
+class TimingSummary:
+    """Sums of durations and the slowest records of one database or of the whole run.
+    It's updated by every record, so its size doesn't depend on number of statements.
+    """
+
+    SLOWEST_KINDS = ("migration", "shard", "statement")
+
+    def __init__(self, top):
+        self.top = top
+        self.seconds = {}
+        self.counts = {}
+        # statements of migrations, they are subtracted from duration of migrations as overhead
+        self.migration_statement_seconds = 0.0
+        # {kind: min-heap of (seconds, -sequence, record)}, its root is the fastest of the slowest
+        self.slowest = {kind: [] for kind in self.SLOWEST_KINDS}
+        self._sequence = 0
+
+    def add(self, record):
+        kind = record["kind"]
+        self.seconds[kind] = self.seconds.get(kind, 0.0) + record["seconds"]
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if kind == "statement" and "migration" in record:
+            self.migration_statement_seconds += record["seconds"]
+
+        slowest = self.slowest.get(kind)
+        if slowest is None:
+            return
+        # sequence keeps the earliest of records with the same duration
+        self._sequence += 1
+        item = (record["seconds"], -self._sequence, record)
+        if len(slowest) < self.top:
+            heapq.heappush(slowest, item)
+        else:
+            heapq.heappushpop(slowest, item)
+
+    def _slowest(self, kind):
+        return [record for _, _, record in sorted(self.slowest[kind], reverse=True)]
+
+    def report(self):
+        summary = {
+            "connect_seconds": self.seconds.get("connect", 0),
+            "init_seconds": self.seconds.get("init", 0),
+            "migration_seconds": self.seconds.get("migration", 0),
+            "statement_count": self.counts.get("statement", 0),
+            "statement_seconds": self.seconds.get("statement", 0),
+            "slowest_migrations": self._slowest("migration"),
+            "slowest_shards": self._slowest("shard"),
+            "slowest_statements": self._slowest("statement"),
+            "lock_retry_count": self.counts.get("lock_retry", 0),
+            "lock_retry_seconds": self.seconds.get("lock_retry", 0),
+        }
+        # time spent in migrations but not in database calls, i.e. sdbmigrate itself.
+        # It's approximate: statements of concurrent shards overlap in time
+        summary["overhead_seconds"] = max(summary["migration_seconds"] - self.migration_statement_seconds, 0)
+        return summary
+
+
+class TimingRecorder:
+    """Collects durations of connections, migrations, shards and statements.
+    Labels of outer measure() calls(e.g. db and migration) are inherited by
+    inner ones made in the same thread.
+    """
+
+    MAX_STATEMENT_LENGTH = 200
+
+    def __init__(self, summarize=True, top=10):
+        """
+        :param summarize: False means that records are only passed to listeners,
+                          e.g. when metrics are exported without timing report
+        :param top: number of the slowest migrations, shards and statements in report
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.summarize = summarize
+        self.top = top
+        self.summary = TimingSummary(top)
+        self.db_summaries = {}
+        self.listeners = []
+
+    @contextmanager
+    def labels(self, **labels):
+        """Set labels of records measured in this thread without measuring anything"""
+        parent_labels = getattr(self._local, "labels", {})
+        self._local.labels = dict(parent_labels, **labels)
+        try:
+            yield self._local.labels
+        finally:
+            self._local.labels = parent_labels
+
+    @contextmanager
+    def measure(self, kind, **labels):
+        with self.labels(**labels) as record_labels:
+            started = time.perf_counter()
+            failed = False
+            try:
+                yield
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                self.add(kind, time.perf_counter() - started, failed, **record_labels)
+
+    def add(self, kind, seconds, failed=False, **labels):
+        """Add record measured elsewhere, e.g. by coroutine which can't use thread-local labels"""
+        record = dict(labels, kind=kind, seconds=seconds)
+        if "statement" in record:
+            # the slowest records are kept for the whole run, so whole statements of large migrations are not
+            record["statement"] = record["statement"][:self.MAX_STATEMENT_LENGTH]
+        if failed:
+            record["failed"] = True
+        with self._lock:
+            if self.summarize:
+                self.summary.add(record)
+                db = record.get("db", "unknown")
+                db_summary = self.db_summaries.get(db)
+                if db_summary is None:
+                    db_summary = self.db_summaries[db] = TimingSummary(self.top)
+                db_summary.add(record)
+            for listener in self.listeners:
+                listener(record)
+
+    def report(self):
+        with self._lock:
+            report = self.summary.report()
+            report["databases"] = {
+                db_name: db_summary.report() for db_name, db_summary in sorted(self.db_summaries.items())
+            }
+        return report
+
+    def write_report(self, path):
+        with open(path, mode="w", encoding="utf8") as report_file:
+            json.dump(self.report(), report_file, indent=2, default=str)
+
+
+class MetricsExporter:
+    """Aggregates TimingRecorder records into OpenMetrics/Prometheus metrics.
+    Metrics may be written to textfile of node_exporter and/or served over HTTP.
+    """
+
+    MIGRATION_DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, float("inf"))
+
+    def __init__(self, timings):
+        self.log = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self.db_sessions = []
+        # {(db, migration): [bucket counts, sum, count]}
+        self.migration_durations = {}
+        self.statements = {}
+        self.shards = {}
+        self.errors = {}
+        self.lock_retries = {}
+        self._stop_event = threading.Event()
+        self._server = None
+        timings.listeners.append(self.observe)
+
+    def observe(self, record):
+        """TimingRecorder listener, it's called under lock of recorder"""
+        db = record.get("db", "unknown")
+        with self._lock:
+            if record.get("failed") and record["kind"] in ("connect", "init", "migration", "shard"):
+                key = (db, record["kind"])
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if record["kind"] == "statement":
+                self.statements[db] = self.statements.get(db, 0) + 1
+            elif record["kind"] == "shard":
+                self.shards[db] = self.shards.get(db, 0) + 1
+            elif record["kind"] == "lock_retry":
+                self.lock_retries[db] = self.lock_retries.get(db, 0) + 1
+            elif record["kind"] == "migration":
+                key = (db, record["migration"])
+                buckets, total, count = self.migration_durations.get(
+                    key, ([0] * len(self.MIGRATION_DURATION_BUCKETS), 0.0, 0)
+                )
+                buckets = [
+                    bucket + (1 if record["seconds"] <= bound else 0)
+                    for bucket, bound in zip(buckets, self.MIGRATION_DURATION_BUCKETS)
+                ]
+                self.migration_durations[key] = (buckets, total + record["seconds"], count + 1)
+
+    @staticmethod
+    def _labels(**labels):
+        def escape(value):
+            return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+        return "{" + ",".join('{}="{}"'.format(key, escape(value)) for key, value in labels.items()) + "}"
+
+    def render(self, openmetrics=False):
+        """Render metrics in OpenMetrics or Prometheus text format,
+        they differ in names of counter families and # EOF in the end.
+        """
+        def counter(name, help_text, values, label_names):
+            family = name if openmetrics else name + "_total"
+            lines.append("# HELP {} {}".format(family, help_text))
+            lines.append("# TYPE {} counter".format(family))
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key, )
+                labels = self._labels(**dict(zip(label_names, key)))
+                lines.append("{}_total{} {}".format(name, labels, value))
+
+        lines = []
+        with self._lock:
+            lines.append("# HELP sdbmigrate_migration_duration_seconds Duration of migration on database")
+            lines.append("# TYPE sdbmigrate_migration_duration_seconds histogram")
+            for (db, migration), (buckets, total, count) in sorted(self.migration_durations.items()):
+                for bucket, bound in zip(buckets, self.MIGRATION_DURATION_BUCKETS):
+                    le = "+Inf" if bound == float("inf") else bound
+                    lines.append("sdbmigrate_migration_duration_seconds_bucket{} {}".format(
+                        self._labels(db=db, migration=migration, le=le), bucket
+                    ))
+                labels = self._labels(db=db, migration=migration)
+                lines.append("sdbmigrate_migration_duration_seconds_sum{} {}".format(labels, total))
+                lines.append("sdbmigrate_migration_duration_seconds_count{} {}".format(labels, count))
+
+            counter("sdbmigrate_statements", "Statements executed on database", self.statements, ("db", ))
+            counter("sdbmigrate_shards", "Shards processed on database", self.shards, ("db", ))
+            counter(
+                "sdbmigrate_errors", "Failed connections, migrations and shards", self.errors, ("db", "kind")
+            )
+            counter(
+                "sdbmigrate_lock_retries", "Retries after lock timeout on database",
+                self.lock_retries, ("db", ),
+            )
+
+        lines.append("# HELP sdbmigrate_schema_version Current schema version of database")
+        lines.append("# TYPE sdbmigrate_schema_version gauge")
+        for db in self.db_sessions:
+            if db.schema_version is not None:
+                lines.append("sdbmigrate_schema_version{} {}".format(self._labels(db=db), db.schema_version))
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write metrics atomically, as node_exporter textfile collector expects"""
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        try:
+            with open(tmp_path, mode="w", encoding="utf8") as metrics_file:
+                metrics_file.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.log.warning("Unable to write metrics to %s: %s", path, e)
+
+    def start(self, textfile=None, port=None, interval=15):
+        if textfile:
+            def write_periodically():
+                while not self._stop_event.wait(interval):
+                    self.write_textfile(textfile)
+
+            threading.Thread(target=write_periodically, name="sdbmigrate-metrics", daemon=True).start()
+
+        if port:
+            exporter = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                """Serves metrics on any path"""
+
+                def do_GET(self):  # pylint: disable=invalid-name
+                    openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                    body = exporter.render(openmetrics=openmetrics).encode("utf8")
+                    self.send_response(200)
+                    if openmetrics:
+                        content_type = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+                    else:
+                        content_type = "text/plain; version=0.0.4; charset=utf-8"
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                    exporter.log.debug(format, *args)
+
+            self._server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+            threading.Thread(
+                target=self._server.serve_forever, name="sdbmigrate-metrics-http", daemon=True
+            ).start()
+            self.log.info("Serve metrics on http://127.0.0.1:%s/metrics", port)
+
+    def stop(self, textfile=None):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if textfile:
+            self.write_textfile(textfile)
+
+
+def measure(timings, kind, **labels):
+    """Context manager measuring duration of the block if timings is enabled"""
+    if timings is None:
+        return nullcontext()
+    return timings.measure(kind, **labels)
+
+
 class DbSession:  # pylint: disable=too-many-instance-attributes
     """Class for encapsulating all about sharded DB
     and its settings.
@@ -86,7 +471,8 @@ class DbSession:  # pylint: disable=too-many-instance-attributes
         shard_ids=None,
         migrations=None,
         migrate_state_schema=None,
-        env=None
+        env=None,
+        timings=None
     ):
         self.config = db_config
         self.host = self.config["host"]
@@ -96,14 +482,24 @@ class DbSession:  # pylint: disable=too-many-instance-attributes
         self.password = self.config["password"]
         self.type = self.config["type"]
         self.shards = self.config.get("shards", [])
+        self.max_shard_jobs = self.config.get("max_shard_jobs")
         self.index = db_index
         self.trx_conn = trx_conn
         self.notrx_conn = notrx_conn
+        # extra autocommit connections for applying NOTRX shard migrations concurrently
+        self.notrx_pool = []
         self.schema_version = schema_version
         self.shard_ids = shard_ids
         self.migrations = migrations
         self.migrate_state_schema = migrate_state_schema
         self.env = env
+        self.timings = timings
+        self.lock_retry = LockRetry(self)
+
+    @property
+    def endpoint(self):
+        """Physical server of database, several databases of config may share it"""
+        return "{}:{}".format(self.host, self.port)
 
     @property
     def schema(self):
@@ -124,6 +520,65 @@ class DbSession:  # pylint: disable=too-many-instance-attributes
         return self.__str__()
 
 
+def is_lock_timeout_error(error):
+    """Check if statement failed because it waited for lock longer than lock_timeout.
+    Errors of both drivers are checked without importing them.
+    """
+    # pgcode is set by psycopg2, sqlstate by psycopg 3
+    if POSTGRES_LOCK_NOT_AVAILABLE in (getattr(error, "pgcode", None), getattr(error, "sqlstate", None)):
+        return True
+    args = getattr(error, "args", ())
+    return bool(args) and args[0] == MYSQL_LOCK_WAIT_TIMEOUT
+
+
+class LockRetry:
+    """Retries of statements or transactions on db failed because of lock timeout
+    with jittered exponential backoff.
+    """
+
+    def __init__(self, db, retries=0, delay=1.0, max_delay=LOCK_RETRY_MAX_DELAY):
+        """
+        :param retries: max number of retries of one call, 0 disables retries
+        :param delay: backoff before the first retry in seconds, it's doubled for every next one
+        """
+        self.db = db
+        self.retries = retries
+        self.delay = delay
+        self.max_delay = max_delay
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        # half of delay is random, so retries of concurrent shards and databases don't collide
+        delay = min(self.delay * 2 ** (attempt - 1), self.max_delay)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def should_retry(self, error, attempt):
+        return attempt < self.retries and is_lock_timeout_error(error)
+
+    def wait(self, attempt, description, error):
+        delay = self.backoff(attempt)
+        with self._lock:
+            self.count += 1
+        logging.warning(
+            "Lock timeout on %s, retry %s of %s in %.1fs: %s. Error: %s",
+            self.db, attempt, self.retries, delay, description, str(error).strip(),
+        )
+        with measure(self.db.timings, "lock_retry", db=str(self.db)):
+            time.sleep(delay)
+
+    def call(self, description, func, *args):
+        attempt = 0
+        while True:
+            try:
+                return func(*args)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self.wait(attempt, description, e)
+
+
 class Sql:
     """
     Class that allows to encapsulate differences of SQL for different database types
@@ -142,14 +597,47 @@ class Sql:
         return sql_str
 
     def resolve_for(self, db):
-        return env_query(self.get_for(db), {"db_schema": {"value": db.schema}})
+        return get_sql_template(self.get_for(db)).render({DB_SCHEMA_VARIABLE: str(db.schema)})
 
 
-def connect(db_info, log=None, autocommit=False):
+def connect(db_info, log=None, autocommit=False, multi_statements=False, timings=None, local_infile=False):
     """
     Setup and return connection to single database.
+    multi_statements allows to send several statements in one query, it's always
+    allowed by psycopg2 and needs CLIENT.MULTI_STATEMENTS flag for MySQLdb.
+    timings is TimingRecorder for statements executed using this connection.
+    local_infile allows LOAD DATA LOCAL INFILE of CSV migrations on MySQL. It's off
+    by default, because server may read any file of client then.
     """
     if db_info["type"] == DB_TYPE_POSTGRES:
+        timeouts = {}
+        if db_info.get("connect_timeout") is not None:
+            timeouts["connect_timeout"] = db_info["connect_timeout"]
+        if db_info.get("read_timeout") is not None:
+            # libpq has no read timeout, the closest one is a limit for
+            # unacknowledged data in TCP socket, specified in milliseconds
+            timeouts["tcp_user_timeout"] = int(db_info["read_timeout"] * 1000)
+        if db_info.get("lock_timeout") is not None:
+            timeouts["options"] = "-c lock_timeout={}".format(int(db_info["lock_timeout"] * 1000))
+
+        if db_info.get("driver") == POSTGRES_DRIVER_PSYCOPG:
+            import psycopg  # pylint: disable=import-outside-toplevel,import-error
+
+            # https://www.psycopg.org/psycopg3/docs/api/connections.html
+            # ClientCursor binds arguments on client side like psycopg2 does,
+            # so the same queries and multi-statement Python migrations work
+            connection = psycopg.connect(
+                host=db_info["host"],
+                port=db_info["port"],
+                dbname=db_info["name"],
+                user=db_info["user"],
+                password=db_info["password"],
+                autocommit=autocommit,
+                cursor_factory=psycopg.ClientCursor,
+                **timeouts,
+            )
+            return PsycopgConnectionWrapper(connection, log, timings)
+
         import psycopg2  # pylint: disable=import-outside-toplevel,import-error
 
         # https://www.psycopg.org/docs/module.html
@@ -159,12 +647,23 @@ def connect(db_info, log=None, autocommit=False):
             dbname=db_info["name"],
             user=db_info["user"],
             password=db_info["password"],
+            **timeouts,
         )
         connection.autocommit = autocommit
-        return PostgresConnectionWrapper(connection, log)
+        return PostgresConnectionWrapper(connection, log, timings)
     if db_info["type"] == DB_TYPE_MYSQL:
         from MySQLdb import Connection  # pylint: disable=import-outside-toplevel,import-error
-
+        from MySQLdb.constants import CLIENT  # pylint: disable=import-outside-toplevel,import-error
+
+        timeouts = {
+            key: db_info[key] for key in DB_CONNECTION_TIMEOUT_SETTINGS if db_info.get(key) is not None
+        }
+        if db_info.get("lock_timeout") is not None:
+            # both timeouts are in whole seconds: for metadata locks of DDL and for row locks
+            lock_timeout = max(int(math.ceil(db_info["lock_timeout"])), 1)
+            timeouts["init_command"] = (
+                "SET SESSION lock_wait_timeout={0}, SESSION innodb_lock_wait_timeout={0}".format(lock_timeout)
+            )
         # https://mysqlclient.readthedocs.io/user_guide.html
         connection = Connection(
             host=db_info["host"],
@@ -173,8 +672,11 @@ def connect(db_info, log=None, autocommit=False):
             passwd=db_info["password"],
             db=db_info["name"],
             autocommit=autocommit,
+            client_flag=CLIENT.MULTI_STATEMENTS if multi_statements else 0,
+            local_infile=int(local_infile),
+            **timeouts,
         )
-        return MysqlConnectionWrapper(connection, log, autocommit)
+        return MysqlConnectionWrapper(connection, log, autocommit, timings, schema=db_info["name"])
     raise ValueError("Invalid db type %s" % db_info["type"])
 
 
@@ -184,23 +686,63 @@ class PostgresConnectionWrapper:
     In other cases this class just redirects calls to the native connection.
     """
 
-    def __init__(self, connection, log=None):
+    def __init__(self, connection, log=None, timings=None):
         self.log = log
+        self.timings = timings
+        # LockRetry for statements, it's used only for autocommit connections
+        self.lock_retry = None
         self._connection = connection
+        # cursors of `with connection` block were native psycopg2 cursors, which
+        # don't format statements without arguments, so `%` is sent as is there
+        self._in_transaction_block = False
 
     def rollback(self):
         return self._connection.rollback()
 
     def __enter__(self):
-        return self._connection.__enter__()
+        # return the wrapper itself, so statements of transaction go through CursorWrapper too
+        self._connection.__enter__()
+        self._in_transaction_block = True
+        return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self._in_transaction_block = False
         return self._connection.__exit__(exc_type, exc_value, traceback)
 
     @contextmanager
     def cursor(self):
         with self._connection.cursor():
-            yield CursorWrapper(self._connection.cursor(), self.log)
+            yield CursorWrapper(
+                self._connection.cursor(), self.log, timings=self.timings, lock_retry=self.lock_retry,
+                format_without_args=not self._in_transaction_block,
+            )
+
+
+class PsycopgConnectionWrapper(PostgresConnectionWrapper):
+    """
+    PostgresConnectionWrapper for psycopg 3 connection.
+    Context manager of psycopg 3 connection closes it on exit, so transaction
+    is committed or rolled back here the same way as it is done in psycopg2.
+    """
+
+    def __enter__(self):
+        self._in_transaction_block = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._in_transaction_block = False
+        if exc_type is None:
+            self._connection.commit()
+        else:
+            self._connection.rollback()
+
+    @contextmanager
+    def cursor(self):
+        with self._connection.cursor() as cursor:
+            yield PsycopgCursorWrapper(
+                cursor, self.log, timings=self.timings, lock_retry=self.lock_retry,
+                format_without_args=not self._in_transaction_block,
+            )
 
 
 class MysqlConnectionWrapper:
@@ -210,12 +752,32 @@ class MysqlConnectionWrapper:
     In other cases this class just redirects calls to the native connection.
     """
 
-    def __init__(self, connection, log=None, autocommit=False):
+    def __init__(self, connection, log=None, autocommit=False, timings=None, schema=None):
         self.log = log
+        self.timings = timings
+        # LockRetry for statements, it's used only for autocommit connections
+        self.lock_retry = None
+        # current database of connection
+        self.schema = schema
         self._connection = connection
         self._autocommit = autocommit
         self._is_in_trx = False
 
+    @property
+    def autocommit(self):
+        return self._autocommit
+
+    def use(self, schema, autocommit):
+        """Switch connection to other database of the same server and transaction mode"""
+        assert not self._is_in_trx
+        if schema != self.schema:
+            self.log.debug("use database %s on %s", schema, self._connection)
+            self._connection.select_db(schema)
+            self.schema = schema
+        if autocommit != self._autocommit:
+            self._connection.autocommit(autocommit)
+            self._autocommit = autocommit
+
     def rollback(self):
         assert self._is_in_trx
         return self._connection.rollback()
@@ -240,23 +802,181 @@ class MysqlConnectionWrapper:
     def cursor(self):
         with self._connection.cursor():
             yield CursorWrapper(
-                cursor=self._connection.cursor(), log=self.log, name=str(self._connection)
+                cursor=self._connection.cursor(),
+                log=self.log,
+                name=str(self._connection),
+                timings=self.timings,
+                lock_retry=self.lock_retry,
             )
 
 
+class MysqlConnectionPool:
+    """
+    Connections to one MySQL server shared by all its databases of config.
+    SharedMysqlConnection takes connection for a transaction or a cursor and switches it
+    to its database and autocommit mode, so number of connections to server is number
+    of its databases used at the same time rather than two per database.
+    """
+
+    def __init__(self, connect_func):
+        """
+        :param connect_func: called with autocommit, returns new MysqlConnectionWrapper
+        """
+        self._connect = connect_func
+        self._lock = threading.Lock()
+        self._connect_lock = threading.Lock()
+        self._idle = []
+        self.size = 0
+
+    def acquire(self, schema, autocommit):
+        with self._lock:
+            connection = None
+            if self._idle:
+                # connection which doesn't need to be switched is preferred
+                index = next(
+                    (
+                        index for index, idle in enumerate(self._idle)
+                        if idle.schema == schema and idle.autocommit == autocommit
+                    ),
+                    len(self._idle) - 1,
+                )
+                connection = self._idle.pop(index)
+        if connection is None:
+            connection = self._new_connection(autocommit)
+        connection.use(schema, autocommit)
+        return connection
+
+    def release(self, connection):
+        with self._lock:
+            self._idle.append(connection)
+
+    def warm_up(self):
+        """Open the first connection, so databases of server don't connect concurrently
+        and connection errors are reported on start
+        """
+        with self._connect_lock:
+            if self.size == 0:
+                self.release(self._new_connection(autocommit=False))
+
+    def _new_connection(self, autocommit):
+        connection = self._connect(autocommit=autocommit)
+        with self._lock:
+            self.size += 1
+        return connection
+
+
+class SharedMysqlConnection:
+    """
+    Connection to one MySQL database, which takes connection from MysqlConnectionPool
+    of its server for every transaction and for every cursor outside of transaction.
+    It has the same interface as MysqlConnectionWrapper.
+    """
+
+    def __init__(self, pool, schema, log=None, autocommit=False, timings=None):
+        self.pool = pool
+        self.schema = schema
+        self.log = log
+        self.timings = timings
+        # LockRetry for statements, it's used only for autocommit connections
+        self.lock_retry = None
+        self._autocommit = autocommit
+        # connection taken for transaction
+        self._connection = None
+
+    def _acquire(self):
+        connection = self.pool.acquire(self.schema, self._autocommit)
+        connection.lock_retry = self.lock_retry
+        return connection
+
+    def rollback(self):
+        assert self._connection is not None
+        return self._connection.rollback()
+
+    def __enter__(self):
+        assert self._connection is None
+        connection = self._acquire()
+        try:
+            connection.__enter__()
+        except Exception:
+            self.pool.release(connection)
+            raise
+        self._connection = connection
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection, self._connection = self._connection, None
+        try:
+            return connection.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.pool.release(connection)
+
+    @contextmanager
+    def cursor(self):
+        if self._connection is not None:
+            with self._connection.cursor() as cursor:
+                yield cursor
+            return
+
+        connection = self._acquire()
+        try:
+            with connection.cursor() as cursor:
+                yield cursor
+        finally:
+            self.pool.release(connection)
+
+    def __str__(self):
+        return "SharedMysqlConnection[{}]".format(self.schema)
+
+
 class CursorWrapper:
     """
-    Wrapper for DB API V2.0 cursors that just adds debug logging.
+    Wrapper for DB API V2.0 cursors that just adds debug logging,
+    timing of statements and their retries after lock timeout.
     """
 
-    def __init__(self, cursor, log, name=None):
+    # True if several statements may be sent by execute_pipeline()
+    supports_pipeline = False
+
+    def __init__(self, cursor, log, name=None, timings=None, lock_retry=None, format_without_args=True):
+        """
+        :param format_without_args: False means that statement without arguments is sent
+                                    as is, otherwise `%%` in it is sent as `%` by driver
+        """
         self.cursor = cursor
         self.log = log
         self.name = name or str(cursor)
+        self.timings = timings
+        self.lock_retry = lock_retry
+        self.format_without_args = format_without_args
+
+    def execute(self, query, args=(), retry=True):
+        """
+        :param retry: False means that statement failed because of lock timeout is not retried,
+                      e.g. when query consists of several statements. CREATE INDEX CONCURRENTLY
+                      and REINDEX CONCURRENTLY are never retried
+        """
+        if not args and not self.format_without_args:
+            args = None
+        if retry and self.lock_retry is not None and not LOCK_RETRY_UNSAFE_RE.match(query):
+            self.lock_retry.call(query, self._execute, query, args)
+        else:
+            self._execute(query, args)
 
-    def execute(self, query, args=()):
+    def _execute(self, query, args):
         self.log.debug("execute SQL %s with args: %s on %s", query, args, self.name)
-        self.cursor.execute(query, args)
+        with measure(self.timings, "statement", statement=query):
+            self.cursor.execute(query, args)
+
+    def copy_csv(self, query, data_file):
+        """Run COPY ... FROM STDIN with data of CSV migration, it's supported only by psycopg2.
+        copy_expert of driver is left as is for Python migrations.
+        """
+        self.log.debug("copy %s from %s on %s", query, data_file.name, self.name)
+        with measure(self.timings, "statement", statement=query):
+            self.cursor.copy_expert(query, data_file)
+
+    def execute_pipeline(self, queries):
+        raise NotImplementedError("Pipeline mode is not supported by {}".format(self.name))
 
     def fetchone(self):
         result = self.cursor.fetchone()
@@ -274,7 +994,46 @@ class CursorWrapper:
         return getattr(self.cursor, name)
 
 
-class DbWrapper:
+class PsycopgCursorWrapper(CursorWrapper):
+    """CursorWrapper for psycopg 3 cursor, which can send statements in pipeline mode"""
+
+    supports_pipeline = True
+
+    def copy_csv(self, query, data_file):
+        self.log.debug("copy %s from %s on %s", query, data_file.name, self.name)
+        with measure(self.timings, "statement", statement=query):
+            with self.cursor.copy(query) as copy_data:
+                for chunk in iter(functools.partial(data_file.read, SQL_STREAM_CHUNK_SIZE), ""):
+                    copy_data.write(chunk)
+
+    def execute_pipeline(self, queries):
+        """Send all queries without waiting for result of every one of them.
+        Server skips queries after the failed one, so all of them are either applied or not
+        in transaction. Every query has own cursor, the failed one is the first query
+        which cursor has no result.
+        :return: (index of failed query, error) or None if all queries succeeded
+        """
+        connection = self.cursor.connection
+        cursors = []
+        self.log.debug("execute %s SQL statements in pipeline on %s", len(queries), self.name)
+        try:
+            with measure(self.timings, "statement", statement="\n".join(queries)):
+                with connection.pipeline():
+                    for query in queries:
+                        cursors.append(connection.cursor())
+                        cursors[-1].execute(query)
+        except Exception as e:  # pylint: disable=broad-except
+            for index, cursor in enumerate(cursors):
+                if cursor.pgresult is None:
+                    return index, e
+            raise
+        finally:
+            for cursor in cursors:
+                cursor.close()
+        return None
+
+
+class DbWrapper:  # pylint: disable=too-many-public-methods
     """Class for encapsulating all DB-specific code.
     Supported databases:
         PostgreSQL 9.6 .. 11
@@ -287,14 +1046,16 @@ class DbWrapper:
                 CREATE TABLE IF NOT EXISTS <db_schema>._sdbmigrate_migrations (
                     version BIGINT NOT NULL PRIMARY KEY,
                     migration_name TEXT NOT NULL,
-                    applied TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW()
+                    applied TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
+                    checksum VARCHAR(64)
                 );
             """,
             mysql="""
                 CREATE TABLE IF NOT EXISTS <db_schema>._sdbmigrate_migrations (
                     version BIGINT NOT NULL PRIMARY KEY,
                     migration_name TEXT NOT NULL,
-                    applied TIMESTAMP DEFAULT NOW()
+                    applied TIMESTAMP DEFAULT NOW(),
+                    checksum VARCHAR(64)
                 );
             """,
         ),
@@ -338,31 +1099,167 @@ class DbWrapper:
                 );
             """,
         ),
+        # shards of NOTRX_SHARD migration which are already applied, so failed
+        # migration is continued from the first unfinished shard on rerun
+        "_sdbmigrate_shard_progress": Sql(
+            postgres="""
+                CREATE TABLE IF NOT EXISTS <db_schema>._sdbmigrate_shard_progress (
+                    version BIGINT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    applied TIMESTAMP WITHOUT TIME ZONE DEFAULT NOW(),
+                    PRIMARY KEY (version, shard_id)
+                );
+            """,
+            mysql="""
+                CREATE TABLE IF NOT EXISTS <db_schema>._sdbmigrate_shard_progress (
+                    version BIGINT NOT NULL,
+                    shard_id INTEGER NOT NULL,
+                    applied TIMESTAMP DEFAULT NOW(),
+                    PRIMARY KEY (version, shard_id)
+                );
+            """,
+        ),
+    }
+    # columns added to state tables created by previous versions of sdbmigrate
+    SDB_STATE_COLUMNS = {
+        # sha256 of migration file, it's NULL for migrations applied before it was added
+        "_sdbmigrate_migrations.checksum": Sql(
+            postgres=(
+                "ALTER TABLE <db_schema>._sdbmigrate_migrations ADD COLUMN IF NOT EXISTS checksum VARCHAR(64)"
+            ),
+            mysql="ALTER TABLE <db_schema>._sdbmigrate_migrations ADD COLUMN checksum VARCHAR(64)",
+        ),
     }
     SDB_ENV_TYPES = {"int", "str", "float"}
 
-    def __init__(self, args, sdbmigrate_config):
+    def __init__(self, args, sdbmigrate_config, read_only=False, timings=None, local_infile=False):
+        """
+        :param read_only: only transactional connections are opened, it's enough
+                          for reading sdbmigrate state
+        :param timings: TimingRecorder for connections, statements and migrations
+        :param local_infile: allow LOAD DATA LOCAL INFILE on MySQL connections,
+                             it's needed only for CSV migrations
+        """
         self.log = logging.getLogger(self.__class__.__name__)
         self.args = args
         self.sdbmigrate_config = sdbmigrate_config
+        self.local_infile = local_infile
+        self.read_only = read_only
+        self.timings = timings
         self.migrate_state_schema = None
-
-        self.db_sessions = []
-        for db_index, db in enumerate(sdbmigrate_config["databases"]):
-            db_config = copy.copy(db)
-            trx_conn = self.get_db_connection(db)
-            notrx_conn = self.get_db_connection(db, autocommit=True)
-            if self.args.migrate_state_schema:
-                self.migrate_state_schema = self.args.migrate_state_schema
-
-            db_session = DbSession(
-                db_config, db_index, trx_conn, notrx_conn,
-                migrate_state_schema=self.migrate_state_schema
+        if self.args.migrate_state_schema:
+            self.migrate_state_schema = self.args.migrate_state_schema
+        # MysqlConnectionPool of every MySQL server if share_mysql_connections is enabled
+        self.mysql_pools = {}
+        self._mysql_pools_lock = threading.Lock()
+
+        self.db_sessions = self.connect_all(sdbmigrate_config["databases"])
+
+    def connect_db(self, db_index, db):
+        db_config = copy.copy(db)
+        for key in DB_TIMEOUT_SETTINGS:
+            if key not in db_config and key in self.sdbmigrate_config:
+                db_config[key] = self.sdbmigrate_config[key]
+
+        db_session = DbSession(
+            db_config, db_index, migrate_state_schema=self.migrate_state_schema, timings=self.timings
+        )
+        lock_retries = self.args.lock_retries
+        if lock_retries is None:
+            # without lock_timeout statements wait for lock up to innodb_lock_wait_timeout(50s by default)
+            # on MySQL, so retries would only multiply this time
+            lock_retries = DEFAULT_LOCK_RETRIES if db_config.get("lock_timeout") is not None else 0
+        db_session.lock_retry = LockRetry(db_session, lock_retries, self.args.lock_retry_delay)
+        with measure(self.timings, "connect", db=str(db_session)):
+            db_session.trx_conn = self.get_db_connection(db_config)
+            if db_session.type == DB_TYPE_MYSQL:
+                # DDL commits implicitly on MySQL, so transaction can't be retried as a whole.
+                # Lock wait timeout rolls back only the failed statement, so it's retried alone
+                db_session.trx_conn.lock_retry = db_session.lock_retry
+            if not self.read_only:
+                db_session.notrx_conn = self.get_notrx_connection(db_session)
+        return db_session
+
+    def connect_all(self, databases):
+        """Connect to all databases concurrently.
+        All connection failures are collected and reported by single SdbConnectionError.
+        """
+        workers = max(min(len(databases), MAX_CONNECT_WORKERS), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sdbmigrate-connect") as executor:
+            futures = [
+                executor.submit(self.connect_db, db_index, db) for db_index, db in enumerate(databases)
+            ]
+
+        db_sessions = []
+        errors = []
+        for db, future in zip(databases, futures):
+            try:
+                db_sessions.append(future.result())
+            except Exception as e:  # pylint: disable=broad-except
+                errors.append("DB[host={}, port={}, name={}]: {}".format(
+                    db.get("host"), db.get("port"), db.get("name"), str(e).strip()
+                ))
+
+        if errors:
+            for error in errors:
+                self.log.error("Unable to connect to %s", error)
+            raise SdbConnectionError(
+                "Unable to connect to {} of {} database(s):\n{}".format(
+                    len(errors), len(databases), "\n".join(errors)
+                )
             )
-            self.db_sessions.append(db_session)
+        return db_sessions
 
     def get_db_connection(self, db_info, autocommit=False):
-        return connect(db_info, self.log, autocommit)
+        if self.sdbmigrate_config.get("share_mysql_connections") and db_info["type"] == DB_TYPE_MYSQL:
+            return SharedMysqlConnection(
+                self.get_mysql_pool(db_info), db_info["name"], self.log, autocommit, self.timings
+            )
+        return connect(
+            db_info, self.log, autocommit,
+            multi_statements=self.args.batch_statements > 1, timings=self.timings,
+            local_infile=self.local_infile,
+        )
+
+    def get_mysql_pool(self, db_info):
+        """Return MysqlConnectionPool of server of database, connections with
+        other credentials or timeouts are not shared
+        """
+        key = (db_info["host"], db_info["port"], db_info["user"], db_info["password"]) + tuple(
+            db_info.get(setting) for setting in DB_TIMEOUT_SETTINGS
+        )
+        with self._mysql_pools_lock:
+            pool = self.mysql_pools.get(key)
+            if pool is None:
+                pool = MysqlConnectionPool(functools.partial(
+                    connect, db_info, self.log,
+                    multi_statements=self.args.batch_statements > 1, timings=self.timings,
+                    local_infile=self.local_infile,
+                ))
+                self.mysql_pools[key] = pool
+        pool.warm_up()
+        return pool
+
+    def get_notrx_connection(self, db):
+        """Autocommit connection, its statements failed because of lock timeout are retried"""
+        connection = self.get_db_connection(db.config, autocommit=True)
+        connection.lock_retry = db.lock_retry
+        return connection
+
+    def get_shard_jobs(self, db):
+        """Number of shards of NOTRX migration which may be applied on db concurrently"""
+        shard_jobs = self.args.shard_jobs
+        if db.max_shard_jobs is not None:
+            shard_jobs = min(shard_jobs, db.max_shard_jobs)
+        return max(shard_jobs, 1)
+
+    def get_notrx_pool(self, db, size):
+        """Return `size` autocommit connections to db, db.notrx_conn is the first of them.
+        Missing connections are established on demand and kept in db.notrx_pool.
+        """
+        while len(db.notrx_pool) < size - 1:
+            db.notrx_pool.append(self.get_notrx_connection(db))
+        return [db.notrx_conn] + db.notrx_pool[:size - 1]
 
     def get_shards_for_db_auto(self, db_index, shard_count, shard_on_db):
         if shard_count % shard_on_db != 0:
@@ -482,59 +1379,123 @@ class DbWrapper:
 
             cursor.execute(sql_cmd.resolve_for(db), sql_args)
 
-    def load_sdbmigrate_state(self, db):  # pylint: disable=too-many-locals
-        config_sdbmigrate_env = self.sdbmigrate_config.get("env", {})
+    def load_sdbmigrate_state(self, db):
+        with db.trx_conn as db_conn:
+            with db_conn.cursor() as cursor:
+                self.set_sdbmigrate_sharding_state(db, self.load_sdbmigrate_sharding_state(cursor, db))
+                self.set_sdbmigrate_migrations_state(db, self.load_sdbmigrate_migrations_state(cursor, db))
+                self.set_sdbmigrate_env(db, self.load_sdbmigrate_env(cursor, db))
+
+    def load_sdbmigrate_state_fast(self, db):
+        """Load state of already initialized db using one catalog query and one state query.
+
+        :return: False if sdbmigrate state is not fully initialized in db
+                 and init_sdbmigrate_state should do it in a usual way
+        """
+        if self.args.force_update_env:
+            return False
+
+        sql_cmd_state = Sql(
+            postgres="""
+                SELECT 'sharding', CAST(shard_count AS TEXT), CAST(shard_ids AS TEXT), NULL
+                FROM <db_schema>._sdbmigrate_sharding_state WHERE id=0
+                UNION ALL
+                SELECT 'migration', CAST(version AS TEXT), migration_name, checksum
+                FROM <db_schema>._sdbmigrate_migrations
+                UNION ALL
+                SELECT 'env', key, value, type
+                FROM <db_schema>._sdbmigrate_env
+            """,
+            mysql="""
+                SELECT 'sharding', CAST(shard_count AS CHAR), CAST(shard_ids AS CHAR), NULL
+                FROM <db_schema>._sdbmigrate_sharding_state WHERE id=0
+                UNION ALL
+                SELECT 'migration', CAST(version AS CHAR), migration_name, checksum
+                FROM <db_schema>._sdbmigrate_migrations
+                UNION ALL
+                SELECT 'env', `key`, value, type
+                FROM <db_schema>._sdbmigrate_env
+            """,
+        )
         with db.trx_conn as db_conn:
             with db_conn.cursor() as cursor:
-                self.load_sdbmigrate_sharding_state(cursor, db)
-                self.load_sdbmigrate_migrations_state(cursor, db)
-                db_config_env = self.load_sdbmigrate_env(cursor, db, config_sdbmigrate_env)
-
-                for row in db_config_env:
-                    key = row[0]
-                    db_value_raw = row[1]
-                    db_type = row[2]
-                    self.verify_env_type(key, db_type, db)
-
-                    try:
-                        python_type = eval(db_type)
-                        db_value = python_type(db_value_raw)
-                    except ValueError:
-                        raise SdbInvalidEnv(
-                            "Sdb env in `{}` has wrong value `{}` for key `{}` and type `{}`".format(
-                                db, key, db_value_raw, db_type
-                            )
-                        )
-
-                    if key not in config_sdbmigrate_env:
-                        raise SdbInvalidEnv(
-                            "Sdb env in `{}` has no key `{}` in config env".format(db, key)
-                        )
-                    config_value = config_sdbmigrate_env[key]["value"]
-                    if config_value != db_value:
-                        logging.info(
-                            "env: key is `%s`, db_value is `%s`, config_value is `%s`",
-                            key,
-                            db_value,
-                            config_value,
-                        )
-                        raise SdbInvalidEnv(
-                            "Sdb env in `{}` has different values for key `{}`".format(db, key)
-                        )
-                    config_type = config_sdbmigrate_env[key].get("type", "str")
-                    if config_type != db_type:
-                        logging.info(
-                            "env: key is `%s`, db_type is `%s`, config_type is `%s`",
-                            key,
-                            db_type,
-                            config_type,
-                        )
-                        raise SdbInvalidEnv(
-                            "Sdb env in `{}` has different types for key `{}``".format(db, key)
-                        )
-                db.env = config_sdbmigrate_env
-
-    def load_sdbmigrate_sharding_state(self, cursor, db):
+                if self.get_existing_state_tables(cursor, db) != set(self.SDB_STATE_TABLES) | set(
+                    self.SDB_STATE_COLUMNS
+                ):
+                    return False
+                cursor.execute(sql_cmd_state.resolve_for(db))
+                rows = cursor.fetchall()
+
+        sharding_rows = [(int(row[1]), json.loads(row[2])) for row in rows if row[0] == "sharding"]
+        migration_rows = sorted((int(row[1]), row[2], row[3]) for row in rows if row[0] == "migration")
+        env_rows = sorted(tuple(row[1:]) for row in rows if row[0] == "env")
+        if not sharding_rows or (not env_rows and self.sdbmigrate_config.get("env")):
+            return False
+
+        self.set_sdbmigrate_sharding_state(db, sharding_rows[0], shard_ids_decoded=True)
+        self.set_sdbmigrate_migrations_state(db, migration_rows)
+        self.set_sdbmigrate_env(db, env_rows)
+        self.log.debug("Sdb state of `%s` is loaded by fast path", db)
+        return True
+
+    def set_sdbmigrate_env(self, db, db_config_env):
+        config_sdbmigrate_env = self.sdbmigrate_config.get("env", {})
+        if len(db_config_env) != len(config_sdbmigrate_env):
+            logging.info(
+                "env: config_sdbmigrate_env is `%s`, db_sdbmigrate_env is `%s`",
+                config_sdbmigrate_env,
+                db_config_env,
+            )
+            raise SdbInvalidEnv(
+                "Sdb env in `{}` is not equal to config env: record count mismatch".format(db)
+            )
+
+        for row in db_config_env:
+            key = row[0]
+            db_value_raw = row[1]
+            db_type = row[2]
+            self.verify_env_type(key, db_type, db)
+
+            try:
+                python_type = eval(db_type)
+                db_value = python_type(db_value_raw)
+            except ValueError:
+                raise SdbInvalidEnv(
+                    "Sdb env in `{}` has wrong value `{}` for key `{}` and type `{}`".format(
+                        db, key, db_value_raw, db_type
+                    )
+                )
+
+            if key not in config_sdbmigrate_env:
+                raise SdbInvalidEnv(
+                    "Sdb env in `{}` has no key `{}` in config env".format(db, key)
+                )
+            config_value = config_sdbmigrate_env[key]["value"]
+            if config_value != db_value:
+                logging.info(
+                    "env: key is `%s`, db_value is `%s`, config_value is `%s`",
+                    key,
+                    db_value,
+                    config_value,
+                )
+                raise SdbInvalidEnv(
+                    "Sdb env in `{}` has different values for key `{}`".format(db, key)
+                )
+            config_type = config_sdbmigrate_env[key].get("type", "str")
+            if config_type != db_type:
+                logging.info(
+                    "env: key is `%s`, db_type is `%s`, config_type is `%s`",
+                    key,
+                    db_type,
+                    config_type,
+                )
+                raise SdbInvalidEnv(
+                    "Sdb env in `{}` has different types for key `{}``".format(db, key)
+                )
+        db.env = config_sdbmigrate_env
+
+    @staticmethod
+    def load_sdbmigrate_sharding_state(cursor, db):
         sql_cmd_sharding_state = Sql(
             """
             SELECT
@@ -545,10 +1506,11 @@ class DbWrapper:
                 id=0
         """
         )
-        config_shard_count = self.sdbmigrate_config["shard_count"]
-
         cursor.execute(sql_cmd_sharding_state.resolve_for(db))
-        db_state = cursor.fetchone()
+        return cursor.fetchone()
+
+    def set_sdbmigrate_sharding_state(self, db, db_state, shard_ids_decoded=False):
+        config_shard_count = self.sdbmigrate_config["shard_count"]
         db_shard_count = db_state[0]
         if db_shard_count != config_shard_count:
             raise SdbInvalidShardingConfig(
@@ -557,30 +1519,37 @@ class DbWrapper:
                 )
             )
         db_shard_ids = db_state[1]
-        if db.type == DB_TYPE_MYSQL:
+        if db.type == DB_TYPE_MYSQL and not shard_ids_decoded:
             db_shard_ids = json.loads(db_shard_ids)
 
         db.shard_ids = db_shard_ids
         self.log.debug("Load sdbmigrate state for %s. shard_ids: %s.", db, db.shard_ids)
 
     @staticmethod
-    def load_sdbmigrate_migrations_state(cursor, db):
+    def load_sdbmigrate_migrations_state(cursor, db, with_checksum=True):
+        """
+        :param with_checksum: False for state tables created by previous versions
+                              of sdbmigrate and not updated yet
+        """
         sql_cmd_migrations = Sql(
             """
             SELECT
-                version, migration_name
+                version, migration_name, {}
             FROM
                 <db_schema>._sdbmigrate_migrations
             ORDER BY
                 version
-        """
+        """.format("checksum" if with_checksum else "NULL")
         )
         cursor.execute(sql_cmd_migrations.resolve_for(db))
-        res = cursor.fetchall()
+        return cursor.fetchall()
+
+    @staticmethod
+    def set_sdbmigrate_migrations_state(db, rows):
         db_migrations = []
         last_version = -1
-        for row in res:
-            migration = Migration(version=row[0], full_name=row[1])
+        for row in rows:
+            migration = Migration(version=row[0], full_name=row[1], checksum=row[2])
             last_version = row[0]
             db_migrations.append(migration)
 
@@ -588,7 +1557,7 @@ class DbWrapper:
         db.schema_version = last_version
 
     @staticmethod
-    def load_sdbmigrate_env(cursor, db, config_sdbmigrate_env):
+    def load_sdbmigrate_env(cursor, db):
         sql_cmd_env = Sql(
             postgres="""
                 SELECT
@@ -609,71 +1578,218 @@ class DbWrapper:
         )
 
         cursor.execute(sql_cmd_env.resolve_for(db))
-        db_config_env = cursor.fetchall()
-        if len(db_config_env) != len(config_sdbmigrate_env):
-            logging.info(
-                "env: config_sdbmigrate_env is `%s`, db_sdbmigrate_env is `%s`",
-                config_sdbmigrate_env,
-                db_config_env,
-            )
-            raise SdbInvalidEnv(
-                "Sdb env in `{}` is not equal to config env: record count mismatch".format(db)
-            )
-        return db_config_env
+        return cursor.fetchall()
 
     def init_sdbmigrate_state(self):
-        for db in self.db_sessions:
-            # init sdbmigrate state
-            with db.trx_conn as db_conn:
-                with db_conn.cursor() as cursor:
-                    if self.migrate_state_schema:
-                        self.init_schema(cursor)
-                    self.init_sdbmigrate_state_tables(cursor, db)
-                    self.init_sdbmigrate_shard_state(cursor, db)
-                    self.init_sdbmigrate_env(cursor, db)
+        jobs = self.args.jobs
+        if jobs > 1 and len(self.db_sessions) > 1:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="sdbmigrate-init") as executor:
+                for future in [executor.submit(self.init_db_state, db) for db in self.db_sessions]:
+                    future.result()
+        else:
+            for db in self.db_sessions:
+                self.init_db_state(db)
+
+    def init_db_state(self, db):
+        with measure(self.timings, "init", db=str(db)):
+            self._init_db_state(db)
+
+    def _init_db_state(self, db):
+        if self.load_sdbmigrate_state_fast(db):
+            return
+
+        # init sdbmigrate state
+        with db.trx_conn as db_conn:
+            with db_conn.cursor() as cursor:
+                if self.migrate_state_schema:
+                    self.init_schema(cursor)
+                self.init_sdbmigrate_state_tables(cursor, db)
+                self.init_sdbmigrate_shard_state(cursor, db)
+                self.init_sdbmigrate_env(cursor, db)
 
-            self.load_sdbmigrate_state(db)
+        self.load_sdbmigrate_state(db)
 
     def init_schema(self, cursor):
         cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {self.migrate_state_schema}")
 
     def init_sdbmigrate_state_tables(self, cursor, db):
+        existing_tables = self.get_existing_state_tables(cursor, db)
         for table_name, sql in self.SDB_STATE_TABLES.items():
-            if not self.is_table_exists(cursor, db, table_name):
+            if table_name not in existing_tables:
                 self.log.info("Create new sdbmigrate state table `%s` on `%s`", table_name, db)
                 cursor.execute(sql.resolve_for(db))
+        for column_name, sql in self.SDB_STATE_COLUMNS.items():
+            table_name = column_name.split(".", maxsplit=1)[0]
+            # new tables are created with all columns
+            if table_name in existing_tables and column_name not in existing_tables:
+                self.log.info("Add new sdbmigrate state column `%s` on `%s`", column_name, db)
+                cursor.execute(sql.resolve_for(db))
 
     @staticmethod
     def set_migration_applied(cursor, db, migration):
         sql_cmd = Sql(
             """
             INSERT INTO
-                <db_schema>._sdbmigrate_migrations (version, migration_name)
+                <db_schema>._sdbmigrate_migrations (version, migration_name, checksum)
             VALUES
-                (%(version)s, %(migration_name)s)
+                (%(version)s, %(migration_name)s, %(checksum)s)
         """
         )
         cursor.execute(
             sql_cmd.resolve_for(db),
-            {"version": migration.version, "migration_name": migration.full_name},
+            {
+                "version": migration.version,
+                "migration_name": migration.full_name,
+                "checksum": migration.checksum,
+            },
         )
 
+    def get_db_status(self, db, migrations):
+        """Compare applied migrations of db with migrations directory without writing anything"""
+        status = {
+            "name": db.name,
+            "host": db.host,
+            "port": db.port,
+            "type": db.type,
+            "initialized": False,
+            "schema_version": -1,
+            "pending": [],
+            "unknown": [],
+            # None if drift is not checked, see is_drift_checked
+            "drifted": None,
+        }
+        with measure(self.timings, "init", db=str(db)), db.trx_conn as db_conn:
+            with db_conn.cursor() as cursor:
+                existing_tables = self.get_existing_state_tables(cursor, db)
+                if "_sdbmigrate_migrations" in existing_tables:
+                    status["initialized"] = True
+                    rows = self.load_sdbmigrate_migrations_state(
+                        cursor, db, with_checksum="_sdbmigrate_migrations.checksum" in existing_tables
+                    )
+                    self.set_sdbmigrate_migrations_state(db, rows)
+
+        if status["initialized"]:
+            status["schema_version"] = db.schema_version
+            known_names = {migration.full_name for migration in migrations}
+            status["unknown"] = [m.full_name for m in db.migrations if m.full_name not in known_names]
+            if is_drift_checked(self.args):
+                status["drifted"] = get_drifted_migrations(db, migrations)
+        status["pending"] = [
+            migration.full_name for migration in migrations if migration.version > status["schema_version"]
+        ]
+        return status
+
     @staticmethod
-    def is_table_exists(cursor, db, table_name):
-        sql = Sql(
+    def set_migrations_applied(cursor, db, migrations):
+        values = []
+        sql_args = {}
+        for index, migration in enumerate(migrations):
+            values.append("(%(version_{0})s, %(migration_name_{0})s, %(checksum_{0})s)".format(index))
+            sql_args["version_{}".format(index)] = migration.version
+            sql_args["migration_name_{}".format(index)] = migration.full_name
+            sql_args["checksum_{}".format(index)] = migration.checksum
+
+        sql_cmd = Sql(
+            """
+            INSERT INTO
+                <db_schema>._sdbmigrate_migrations (version, migration_name, checksum)
+            VALUES
+                {}
+        """.format(",\n                ".join(values))
+        )
+        cursor.execute(sql_cmd.resolve_for(db), sql_args)
+
+    @staticmethod
+    def get_pending_shards(cursor, db, migration):
+        """Return shard_ids of db on which NOTRX_SHARD migration is not applied yet"""
+        sql_cmd = Sql(
             """
-            SELECT EXISTS(SELECT 1 FROM
+            SELECT
+                shard_id
+            FROM
+                <db_schema>._sdbmigrate_shard_progress
+            WHERE
+                version=%(version)s
+        """
+        )
+        cursor.execute(sql_cmd.resolve_for(db), {"version": migration.version})
+        completed = {row[0] for row in cursor.fetchall()}
+        pending = [shard_id for shard_id in db.shard_ids if shard_id not in completed]
+        if completed:
+            logging.info(
+                "Continue migration %s on %s from shard %s, %s of %s shards are already applied",
+                migration.full_name,
+                db,
+                pending[0] if pending else None,
+                len(db.shard_ids) - len(pending),
+                len(db.shard_ids),
+            )
+        return pending
+
+    @staticmethod
+    def set_shards_applied(cursor, db, migration, shard_ids):
+        values = []
+        sql_args = {"version": migration.version}
+        for index, shard_id in enumerate(shard_ids):
+            values.append("(%(version)s, %(shard_id_{})s)".format(index))
+            sql_args["shard_id_{}".format(index)] = shard_id
+
+        sql_cmd = Sql(
+            postgres="""
+                INSERT INTO
+                    <db_schema>._sdbmigrate_shard_progress (version, shard_id)
+                VALUES
+                    {}
+                ON CONFLICT DO NOTHING
+            """.format(",\n                    ".join(values)),
+            mysql="""
+                INSERT IGNORE INTO
+                    <db_schema>._sdbmigrate_shard_progress (version, shard_id)
+                VALUES
+                    {}
+            """.format(",\n                    ".join(values)),
+        )
+        cursor.execute(sql_cmd.resolve_for(db), sql_args)
+
+    @staticmethod
+    def reset_shard_progress(cursor, db, migration):
+        sql_cmd = Sql("DELETE FROM <db_schema>._sdbmigrate_shard_progress WHERE version=%(version)s")
+        cursor.execute(sql_cmd.resolve_for(db), {"version": migration.version})
+
+    def get_existing_state_tables(self, cursor, db):
+        """Return set of sdbmigrate state tables and their columns from SDB_STATE_COLUMNS
+        which exist in db, using single query. Columns are returned as `table.column`.
+        """
+        # lists are adapted as arrays by PostgreSQL drivers and as tuples by MySQLdb
+        query = """
+            SELECT table_name FROM
             information_schema.tables
             WHERE table_schema = %(table_schema)s
-            AND table_name = %(table_name)s)
+            AND table_name {table_names}
+            UNION ALL
+            SELECT CONCAT(table_name, '.', column_name) FROM
+            information_schema.columns
+            WHERE table_schema = %(table_schema)s
+            AND CONCAT(table_name, '.', column_name) {column_names}
         """
+        sql = Sql(
+            postgres=query.format(
+                table_names="= ANY(%(table_names)s)", column_names="= ANY(%(column_names)s)"
+            ),
+            mysql=query.format(table_names="IN %(table_names)s", column_names="IN %(column_names)s"),
         )
-        cursor.execute(sql.resolve_for(db), {"table_name": table_name, "table_schema": db.schema})
-        is_exists = cursor.fetchone()[0]
-        return is_exists
+        cursor.execute(
+            sql.resolve_for(db),
+            {
+                "table_names": list(self.SDB_STATE_TABLES),
+                "column_names": list(self.SDB_STATE_COLUMNS),
+                "table_schema": db.schema,
+            },
+        )
+        return {row[0] for row in cursor.fetchall()}
 
 
-class Migration:
+class Migration:  # pylint: disable=too-many-instance-attributes
     """Class for representing one migration loading logic"""
 
     NAME_PATTERN = "^V([0-9]{4})__([A-Z]+)_([A-Z]+)__([a-z0-9_]+).([a-z]+)$"
@@ -692,8 +1808,15 @@ class Migration:
         full_name=None,
         path=None,
         lang=None,
-        code=None
+        code=None,
+        *,
+        checksum=None,
+        manifest=None,
+        parse_cache=None,
+        sql_splitter=SQL_SPLITTER_BUILTIN,
+        strict_placeholders=False,
     ):
+        # pylint: disable=too-many-arguments
         self.version = int(version)
         self.type1 = type1
         self.type2 = type2
@@ -702,9 +1825,42 @@ class Migration:
         self.code = code
         self.path = path
         self.lang = lang
+        self.checksum = checksum
+        self.manifest = manifest
+        self.parse_cache = parse_cache
+        self.sql_splitter = sql_splitter
+        self.strict_placeholders = strict_placeholders
+        self._sql_template = None
+        self._templates = {}
+        self._python_code = None
 
-    def __str__(self):
-        return 'Migration(version="{}", full_name="{}")'.format(self.version, self.full_name)
+    @property
+    def code(self):
+        """Migration code, it's read from file on first access"""
+        if self._code is None and self.path is not None:
+            self.read()
+        return self._code
+
+    @code.setter
+    def code(self, value):
+        self._code = value
+
+    @property
+    def checksum(self):
+        """sha256 of migration file, it's computed on first access"""
+        if self._checksum is None and self.path is not None:
+            if self.manifest is not None:
+                self._checksum = self.manifest.get_checksum(self)
+            else:
+                self._checksum = file_checksum(os.path.join(self.path, self.full_name))
+        return self._checksum
+
+    @checksum.setter
+    def checksum(self, value):
+        self._checksum = value
+
+    def __str__(self):
+        return 'Migration(version="{}", full_name="{}")'.format(self.version, self.full_name)
 
     def __repr__(self):
         return self.__str__()
@@ -716,6 +1872,158 @@ class Migration:
         with open(migration_path, mode='r', encoding='utf8') as migration_file:
             self.code = migration_file.read()
 
+    def check_readable(self, stream_min_size):
+        """ Read pending migration before any database is changed, so unreadable file
+        fails the run before the rollout. Streamed SQL and CSV migrations are read
+        by chunks and not kept in memory.
+        """
+        if self.lang == MIGRATION_LANG_CSV:
+            data_file = self.open_data()[-1]
+        elif self.is_streamed(stream_min_size):
+            # pylint: disable=consider-using-with
+            data_file = open(os.path.join(self.path, self.full_name), mode='r', encoding='utf8')
+        else:
+            if self._code is None and self.path is not None:
+                self.read()
+            return
+        with data_file:
+            for _ in iter(functools.partial(data_file.read, SQL_STREAM_CHUNK_SIZE), ""):
+                pass
+
+    def open_data(self):
+        """ Open CSV migration.
+        Return table name from the first line, columns from CSV header, line terminator
+        of CSV header and the file positioned at CSV header. Data is not read.
+        """
+        migration_path = os.path.join(self.path, self.full_name)
+        # pylint: disable=consider-using-with
+        data_file = open(migration_path, mode='r', encoding='utf8', newline='')
+        try:
+            directive = data_file.readline().strip()
+            if not directive.startswith(CSV_TABLE_DIRECTIVE):
+                raise SdbInvalidConfig(
+                    "CSV migration {} should start with `{} <table>` line".format(
+                        self.full_name, CSV_TABLE_DIRECTIVE
+                    )
+                )
+            header_position = data_file.tell()
+            header = data_file.readline()
+            columns = next(csv.reader([header]), [])
+            data_file.seek(header_position)
+        except BaseException:
+            data_file.close()
+            raise
+        invalid_columns = [column for column in columns if not CSV_COLUMN_RE.match(column)]
+        if not columns or invalid_columns:
+            data_file.close()
+            raise SdbInvalidConfig(
+                "CSV migration {} has invalid header: {}".format(self.full_name, columns)
+            )
+        # csv module writes \r\n by default, COPY accepts both line terminators
+        # and LOAD DATA needs the one of file, otherwise \r is left in the last column
+        line_terminator = "\r\n" if header.endswith("\r\n") else "\n"
+        return directive[len(CSV_TABLE_DIRECTIVE):].strip(), columns, line_terminator, data_file
+
+    def is_streamed(self, min_size):
+        """True if SQL statements of migration should be read from file by chunks,
+        min_size is size of file in bytes.
+        """
+        return (
+            self.lang == MIGRATION_LANG_SQL
+            and self.type2 == self.MIGRATION_TYPE2_PLAIN
+            and self.sql_splitter == SQL_SPLITTER_BUILTIN
+            and self._code is None
+            and self.path is not None
+            and os.path.getsize(os.path.join(self.path, self.full_name)) >= min_size
+        )
+
+    def iter_statements(self, db, chunk_size=SQL_STREAM_CHUNK_SIZE):
+        """ Yield SQL statements for db reading migration file by chunks.
+        Unlike compile() neither code nor statements are kept in memory, so memory
+        is bounded by the largest statement instead of the size of file.
+        """
+        migration_path = os.path.join(self.path, self.full_name)
+        values = self.get_variables(db)
+        placeholder_re = get_env_placeholder_re(db.env)
+        splitter = SqlSplitter()
+        checked = set()
+        with open(migration_path, mode='r', encoding='utf8') as migration_file:
+            chunks = iter(functools.partial(migration_file.read, chunk_size), "")
+            for sql_template in iter_sql_template_chunks(chunks, placeholder_re):
+                self.check_placeholders(sql_template.placeholders - checked, values, db)
+                checked.update(sql_template.placeholders)
+                yield from splitter.feed(sql_template.render(values))
+        yield from splitter.feed("", final=True)
+
+    @staticmethod
+    def get_variables(db):
+        """Values of placeholders in SQL migration for db, <shard_id> is substituted later.
+        They are the same as after replace of env variables one by one in order of config
+        and then of <db_schema>: env may override db_schema and value of variable may have
+        placeholders of the next variables and <db_schema>.
+        """
+        env = db.env or {}
+        keys = [str(key) for key in env]
+        raw_values = [str(var["value"]) for var in env.values()]
+        values = {}
+        for index, key in enumerate(keys):
+            value = raw_values[index]
+            if "<" in value:
+                for next_key, next_value in zip(keys[index + 1:], raw_values[index + 1:]):
+                    value = value.replace("<{}>".format(next_key), next_value)
+                value = value.replace("<{}>".format(DB_SCHEMA_VARIABLE), str(db.schema))
+            values[key] = value
+        values.setdefault(DB_SCHEMA_VARIABLE, str(db.schema))
+        return values
+
+    def check_placeholders(self, placeholders, values, db):
+        unknown = sorted(name for name in placeholders if name not in values and name != "shard_id")
+        if not unknown:
+            return
+        message = "Migration {} has unknown placeholders on {}: {}".format(
+            self.full_name, db, ", ".join("<{}>".format(name) for name in unknown)
+        )
+        if self.strict_placeholders:
+            raise SdbInvalidEnv(message)
+        logging.warning("%s. They are kept as is", message)
+
+    def compile(self, db):
+        """ Return MigrationTemplate of SQL migration for db.
+        Template depends only on db env and schema, so it is built once and
+        then reused for all shards and all databases with the same settings.
+        """
+        env = db.env or {}
+        template_key = (
+            db.type,
+            db.schema,
+            tuple((str(key), str(var["value"])) for key, var in env.items()),
+        )
+        template = self._templates.get(template_key)
+        if template is None:
+            placeholder_re = get_env_placeholder_re(env)
+            if self._sql_template is None or self._sql_template.placeholder_re is not placeholder_re:
+                self._sql_template = SqlTemplate(self.code, placeholder_re)
+            values = self.get_variables(db)
+            self.check_placeholders(self._sql_template.placeholders, values, db)
+            migration_code = self._sql_template.render(values)
+            template = MigrationTemplate(split_sql(migration_code, self.parse_cache, self.sql_splitter))
+            self._templates[template_key] = template
+        return template
+
+    def compile_python(self):
+        """ Return code object of Python migration.
+        It's compiled once with real file name, so tracebacks point to the migration file.
+        """
+        if self._python_code is None:
+            filename = os.path.join(self.path or "", self.full_name)
+            code = self.parse_cache.get_code(self.code, filename) if self.parse_cache else None
+            if code is None:
+                code = compile(self.code, filename, "exec")
+                if self.parse_cache is not None:
+                    self.parse_cache.put_code(self.code, filename, code)
+            self._python_code = code
+        return self._python_code
+
     def write(self):
         """ Write migration code to file.
         """
@@ -724,6 +2032,22 @@ class Migration:
             migration_file.write(self.code)
 
 
+class MigrationTemplate:  # pylint: disable=too-few-public-methods
+    """SQL migration split into statements with all variables except <shard_id> substituted.
+    Each statement is stored as parts around <shard_id>, so rendering it for
+    a shard is just a join.
+    """
+
+    def __init__(self, sql_chunks):
+        self.statements = [sql_chunk.split(SHARD_ID_PLACEHOLDER) for sql_chunk in sql_chunks]
+
+    def render(self, shard_id=None):
+        """Yield SQL statements for shard_id, placeholders are kept as is if shard_id is None"""
+        separator = SHARD_ID_PLACEHOLDER if shard_id is None else str(shard_id)
+        for parts in self.statements:
+            yield separator.join(parts)
+
+
 def load_sdbmigrate_config(path_to_config):
     try:
         with open(path_to_config, encoding='utf8') as config_file:
@@ -751,10 +2075,40 @@ def load_sdbmigrate_config(path_to_config):
         )
         raise SdbInvalidConfig(msg)
 
+    for db_config in sdbmigrate_config["databases"]:
+        driver = db_config.get("driver")
+        if driver is not None and (
+            db_config.get("type") != DB_TYPE_POSTGRES or driver not in POSTGRES_DRIVERS
+        ):
+            raise SdbInvalidConfig(
+                "driver: `{}` of database {} is not supported, it may be one of {} for {} databases".format(
+                    driver, db_config.get("name"), ", ".join(POSTGRES_DRIVERS), DB_TYPE_POSTGRES
+                )
+            )
+
+    if not isinstance(sdbmigrate_config.get("share_mysql_connections", False), bool):
+        raise SdbInvalidConfig(
+            "share_mysql_connections: {} should be true or false".format(
+                sdbmigrate_config["share_mysql_connections"]
+            )
+        )
+
+    max_per_host = sdbmigrate_config.get("max_concurrent_per_host")
+    if max_per_host is not None and (not isinstance(max_per_host, int) or max_per_host < 1):
+        raise SdbInvalidConfig(
+            "max_concurrent_per_host: {} should be a positive integer".format(max_per_host)
+        )
+
     return sdbmigrate_config
 
 
-def load_migrations(path_to_migrations):
+def load_migrations(
+    path_to_migrations,
+    parse_cache=None,
+    sql_splitter=SQL_SPLITTER_BUILTIN,
+    strict_placeholders=False,
+    manifest=None,
+):
     migration_list = os.listdir(path_to_migrations)
     migration_name_re = re.compile(Migration.NAME_PATTERN)
     clean_migration_list = []
@@ -776,8 +2130,12 @@ def load_migrations(path_to_migrations):
             full_name=match_result.group(0),
             path=path_to_migrations,
             lang=match_result.group(5),
+            parse_cache=parse_cache,
+            sql_splitter=sql_splitter,
+            strict_placeholders=strict_placeholders,
+            manifest=manifest,
         )
-        migration.read()
+        # code is read lazily, only for migrations which are going to be applied
         clean_migration_list.append(migration)
 
     # sort migration by version
@@ -787,57 +2145,711 @@ def load_migrations(path_to_migrations):
     return clean_migration_list
 
 
-def shard_query(sql_template, shard_id):
-    return sql_template.replace("<shard_id>", str(shard_id))
+class SqlTemplate:  # pylint: disable=too-few-public-methods
+    """SQL split by <placeholder> tokens in one pass.
+    Rendering is a join of text parts and values, so its cost depends only on size
+    of the text, not on number of variables. Unknown placeholders are kept as is.
+    """
+
+    def __init__(self, sql, placeholder_re=SQL_PLACEHOLDER_RE):
+        self.placeholder_re = placeholder_re
+        # text parts are on even positions, names of placeholders are on odd ones
+        self.parts = placeholder_re.split(sql)
+        self.placeholders = frozenset(self.parts[1::2])
+
+    def render(self, values):
+        if not self.placeholders:
+            return self.parts[0]
+        parts = self.parts[:]
+        for index in range(1, len(parts), 2):
+            value = values.get(parts[index])
+            parts[index] = "<{}>".format(parts[index]) if value is None else value
+        return "".join(parts)
+
+
+def get_env_placeholder_re(env):
+    """Regex of placeholders in migrations for env. Env keys which are not names,
+    e.g. region-id, are substituted as <region-id> too.
+    """
+    return _get_placeholder_re(tuple(sorted(
+        str(key) for key in env or {} if not SQL_PLACEHOLDER_RE.fullmatch("<{}>".format(key))
+    )))
+
+
+@functools.lru_cache(maxsize=16)
+def _get_placeholder_re(names):
+    if not names:
+        return SQL_PLACEHOLDER_RE
+    # the longest name is matched first when one name is a prefix of another
+    alternatives = [re.escape(name) for name in sorted(names, key=len, reverse=True)]
+    return re.compile(r"<({}|[A-Za-z_]\w*)>".format("|".join(alternatives)))
+
+
+@functools.lru_cache(maxsize=1024)
+def get_sql_template(sql):
+    """SqlTemplate of SQL executed many times, e.g. queries of sdbmigrate state"""
+    return SqlTemplate(sql)
+
+
+def file_checksum(path):
+    """Return sha256 of file, it's read by chunks"""
+    checksum = hashlib.sha256()
+    with open(path, mode="rb") as checksum_file:
+        for chunk in iter(functools.partial(checksum_file.read, SQL_STREAM_CHUNK_SIZE), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+class MigrationManifest:
+    """JSON index of migrations directory: version, name, type, size, mtime and checksum
+    of every migration. Checksum of file is computed again only when its size or mtime
+    is changed, so unchanged files are not read.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, path):
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding="utf8") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("format_version") == self.FORMAT_VERSION:
+                self.entries = {entry["name"]: entry for entry in manifest["migrations"]}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log.warning("Ignore broken manifest %s: %s", path, e)
+
+    def get_checksum(self, migration):
+        migration_path = os.path.join(migration.path, migration.full_name)
+        stat = os.stat(migration_path)
+        entry = self.entries.get(migration.full_name)
+        if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["checksum"]
+
+        self.log.debug("Compute checksum of changed migration %s", migration.full_name)
+        entry = {
+            "version": migration.version,
+            "name": migration.full_name,
+            "type": "{}_{}".format(migration.type1, migration.type2),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "checksum": file_checksum(migration_path),
+        }
+        with self._lock:
+            self.entries[migration.full_name] = entry
+            self.changed = True
+        return entry["checksum"]
+
+    def update(self, migrations):
+        """Index all migrations of directory, entries of removed files are dropped"""
+        names = {migration.full_name for migration in migrations}
+        for migration in migrations:
+            self.get_checksum(migration)
+        with self._lock:
+            for name in set(self.entries) - names:
+                del self.entries[name]
+                self.changed = True
+
+    def write(self):
+        if not self.changed:
+            return
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "migrations": sorted(self.entries.values(), key=lambda entry: entry["version"]),
+        }
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            with open(tmp_path, mode="w", encoding="utf8") as manifest_file:
+                json.dump(manifest, manifest_file, indent=2)
+            os.replace(tmp_path, self.path)
+            self.changed = False
+        except OSError as e:
+            self.log.warning("Unable to write manifest %s: %s", self.path, e)
+
+
+class ParseCache:
+    """On-disk cache of parsed migrations: statement boundaries found by SQL splitter
+    for SQL and compiled code objects for Python.
+    Entries are keyed by hash of the source and parser version(SQL splitter and its version or
+    bytecode magic number), so any change of migration, env or parser just leads to a new entry.
+    """
+
+    def __init__(self, cache_dir):
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, parser_version, source, suffix):
+        key = hashlib.sha256()
+        key.update(parser_version)
+        key.update(b"\0")
+        key.update(source.encode("utf8"))
+        return os.path.join(self.cache_dir, key.hexdigest() + suffix)
+
+    def _read(self, entry_path, loader, mode="r"):
+        encoding = None if "b" in mode else "utf8"
+        try:
+            with open(entry_path, mode=mode, encoding=encoding) as entry_file:
+                return loader(entry_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, EOFError, TypeError) as e:
+            self.log.warning("Ignore broken parse cache entry %s: %s", entry_path, e)
+            return None
+
+    def _write(self, entry_path, dumper, mode="w"):
+        encoding = None if "b" in mode else "utf8"
+        # temp file is unique for process and thread, several runs may share cache directory
+        tmp_path = "{}.{}.{}.tmp".format(entry_path, os.getpid(), threading.get_ident())
+        try:
+            with open(tmp_path, mode=mode, encoding=encoding) as entry_file:
+                dumper(entry_file)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            self.log.warning("Unable to write parse cache entry %s: %s", entry_path, e)
+
+    def get_statements(self, sql, splitter=SQL_SPLITTER_BUILTIN):
+        """Return list of statements or None if there is no valid entry for sql"""
+        entry_path = self._entry_path(sql_splitter_version(splitter).encode("utf8"), sql, ".json")
+
+        def load_statements(entry_file):
+            # shape of entry is checked here, so broken entry is ignored by _read
+            boundaries = json.load(entry_file)["statements"]
+            if not isinstance(boundaries, list) or not all(
+                isinstance(boundary, list) and len(boundary) == 2
+                and all(isinstance(position, int) for position in boundary)
+                and 0 <= boundary[0] < boundary[1] <= len(sql)
+                for boundary in boundaries
+            ):
+                raise ValueError("statements should be a list of [start, end] positions in SQL")
+            return [sql[start:end] for start, end in boundaries]
+
+        return self._read(entry_path, load_statements)
+
+    def put_statements(self, sql, chunks, splitter=SQL_SPLITTER_BUILTIN):
+        boundaries = []
+        position = 0
+        for chunk in chunks:
+            start = sql.index(chunk, position)
+            position = start + len(chunk)
+            boundaries.append((start, position))
+
+        parser_version = sql_splitter_version(splitter)
+        entry_path = self._entry_path(parser_version.encode("utf8"), sql, ".json")
+        self._write(
+            entry_path,
+            lambda entry_file: json.dump({"parser": parser_version, "statements": boundaries}, entry_file),
+        )
+
+    def get_code(self, source, filename):
+        """Return code object or None if there is no valid entry for source"""
+        entry_path = self._entry_path(importlib.util.MAGIC_NUMBER, filename + "\0" + source, ".pyc")
+
+        def load_code(entry_file):
+            code = marshal.load(entry_file)
+            if not isinstance(code, types.CodeType):
+                raise ValueError("entry should be a code object, got {}".format(type(code).__name__))
+            return code
+
+        return self._read(entry_path, load_code, mode="rb")
+
+    def put_code(self, source, filename, code):
+        entry_path = self._entry_path(importlib.util.MAGIC_NUMBER, filename + "\0" + source, ".pyc")
+        self._write(entry_path, lambda entry_file: marshal.dump(code, entry_file), mode="wb")
+
+
+def sql_splitter_version(splitter):
+    if splitter == SQL_SPLITTER_SQLPARSE:
+        return "sqlparse {}".format(sqlparse.__version__)
+    return "{} {}".format(splitter, SQL_SPLITTER_VERSION)
+
+
+class SqlSplitter:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """Built-in SQL splitter which finds statements in one pass over the text.
+    Statements are split by `;` outside of quotes, comments, dollar-quoted strings,
+    parentheses and BEGIN ... END blocks of CREATE statements, like sqlparse.split does.
+    MySQL client `DELIMITER` command changes terminator of the following statements,
+    statements are yielded without it.
+
+    Text may be fed by chunks: token which may continue in the next chunk is scanned
+    again when it comes, only the text of unfinished statement is kept.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.delimiter = ";"
+        self.start = self.pos = 0
+        self.terminated = self.has_code = self.is_create = self.after_end = False
+        self.parens = self.blocks = 0
+        # the rest of text has no closing delimiter, so the opening one is just a character
+        self.unclosed_tags = set()
+        self.unclosed_comment = False
+
+    def feed(self, text, final=False):
+        """Yield statements completed by text, final=True means that there is no more text"""
+        self.text = self.text[self.start:] + text
+        self.pos -= self.start
+        self.start = 0
+        yield from self._split(final)
+        if final:
+            statement = self.text[self.start:].strip()
+            if statement:
+                yield statement
+            self.text = ""
+            self.start = self.pos = 0
+
+    def _reset_statement(self, start):
+        self.start = start
+        self.terminated = self.has_code = self.is_create = self.after_end = False
+        self.parens = self.blocks = 0
+
+    def _split(self, final):
+        # pylint: disable=too-many-branches,too-many-statements,too-many-locals
+        sql = self.text
+        length = len(sql)
+        while self.pos < length:
+            pos = self.pos
+            delimiter = self.delimiter
+            if delimiter != ";":
+                if not final and length - pos < len(delimiter) and delimiter.startswith(sql[pos:]):
+                    return
+                if sql.startswith(delimiter, pos):
+                    statement = sql[self.start:pos].strip()
+                    if statement:
+                        yield statement
+                    self.pos = pos + len(delimiter)
+                    self._reset_statement(self.pos)
+                    continue
+
+            match = SQL_TOKEN_RE.match(sql, pos)
+            if not final and match.end() == length:
+                # token may continue in the next chunk
+                return
+            kind = match.lastgroup
+            if not final and sql[pos] == "$" and SQL_DOLLAR_PREFIX_RE.fullmatch(sql, pos):
+                # beginning of dollar quote tag
+                return
+            if self.terminated:
+                # spaces and comments on the same line belong to the terminated statement
+                if kind in ("space", "line_comment"):
+                    self.pos = match.end()
+                    continue
+                statement = sql[self.start:pos].strip()
+                if statement:
+                    yield statement
+                self._reset_statement(pos)
+
+            if kind in ("newline", "space", "line_comment"):
+                self.pos = match.end()
+                continue
+
+            if kind == "other" and sql.startswith("/*", pos) and not self.unclosed_comment:
+                comment_end = sql.find("*/", pos + 2)
+                if comment_end != -1:
+                    self.pos = comment_end + 2
+                    continue
+                if not final:
+                    return
+                self.unclosed_comment = True
+
+            if kind == "dollar":
+                tag = match.group()
+                # $1 parameters and names like a$b$ are not dollar-quoted strings
+                previous_char = sql[pos - 1] if pos > 0 else " "
+                if tag not in self.unclosed_tags and not (previous_char.isalnum() or previous_char in '_"$'):
+                    tag_end = sql.find(tag, match.end())
+                    if tag_end != -1:
+                        self.pos = tag_end + len(tag)
+                        self.has_code = True
+                        self.after_end = False
+                        continue
+                    if not final:
+                        return
+                    self.unclosed_tags.add(tag)
+                kind = "other"
+                match = None
+
+            token_end = match.end() if match is not None else pos + 1
+            closes_block = self.after_end
+            self.after_end = False
+            if kind == "word":
+                word = match.group().upper()
+                if not self.has_code:
+                    if word == "DELIMITER":
+                        line_end = token_end
+                        while line_end < length and sql[line_end] not in "\r\n":
+                            line_end += 1
+                        if line_end == length and not final:
+                            return
+                        self.delimiter = sql[token_end:line_end].strip() or delimiter
+                        self.pos = line_end
+                        self._reset_statement(line_end)
+                        continue
+                    self.is_create = word == "CREATE"
+                elif self.is_create:
+                    if closes_block and word in SQL_END_SUFFIXES:
+                        # END IF, END LOOP, etc. close blocks which were not counted
+                        if word != "CASE":
+                            self.blocks += 1
+                    elif word == "BEGIN":
+                        self.blocks += 1
+                    elif self.blocks > 0 and word == "CASE":
+                        self.blocks += 1
+                    elif self.blocks > 0 and word == "END":
+                        self.blocks -= 1
+                        self.after_end = True
+            elif kind == "other":
+                char = sql[pos]
+                if char == "(":
+                    self.parens += 1
+                elif char == ")":
+                    self.parens = max(self.parens - 1, 0)
+                elif char == ";" and delimiter == ";" and self.parens == 0 and self.blocks <= 0:
+                    self.terminated = True
+            self.has_code = True
+            self.pos = token_end
+
+
+def iter_sql_statements(sql):
+    """Yield statements of sql found by SqlSplitter"""
+    return SqlSplitter().feed(sql, final=True)
+
+
+def iter_sql_template_chunks(chunks, placeholder_re=SQL_PLACEHOLDER_RE):
+    """Yield SqlTemplate of every text chunk.
+    Placeholder split between chunks is carried to the next chunk.
+    """
+    tail = ""
+    for chunk in chunks:
+        text = tail + chunk
+        tail = ""
+        placeholder_start = text.rfind("<", max(len(text) - SQL_PLACEHOLDER_MAX_LENGTH, 0))
+        if placeholder_start != -1 and ">" not in text[placeholder_start:]:
+            text, tail = text[:placeholder_start], text[placeholder_start:]
+        yield SqlTemplate(text, placeholder_re)
+    if tail:
+        yield SqlTemplate(tail, placeholder_re)
+
+
+def split_sql(sql, parse_cache=None, splitter=SQL_SPLITTER_BUILTIN):
+    if parse_cache is not None:
+        chunks = parse_cache.get_statements(sql, splitter)
+        if chunks is not None:
+            return chunks
+
+    if splitter == SQL_SPLITTER_SQLPARSE:
+        chunks = [chunk for chunk in sqlparse.split(sql) if chunk != ""]
+    else:
+        chunks = list(iter_sql_statements(sql))
+    if parse_cache is not None:
+        parse_cache.put_statements(sql, chunks, splitter)
+    return chunks
+
+
+def _do_apply_one_shard(cursor, db, migration, shard_id):
+    with measure(db.timings, "shard", db=str(db), migration=migration.full_name, shard_id=shard_id):
+        _do_apply_one_shard_code(cursor, db, migration, shard_id)
+
+
+def _do_apply_one_shard_code(cursor, db, migration, shard_id):
+    if migration.lang == MIGRATION_LANG_SQL:
+        for sql_chunk in migration.compile(db).render(shard_id):
+            logging.debug("sharded sql_chunk is %s", sql_chunk)
+            cursor.execute(sql_chunk)
+    elif migration.lang == MIGRATION_LANG_PYTHON:
+        exec(
+            migration.compile_python(),
+            {"cursor": cursor, "shard_id": shard_id, "env": db.env},
+        )
+    elif migration.lang == MIGRATION_LANG_CSV:
+        _do_load_data(cursor, db, migration, shard_id)
+    else:
+        raise SdbMigrateError(
+            "Unsupported migration code language: `{}`".format(migration.lang)
+        )
 
 
-def env_query(sql_template, env):
-    for key, var in env.items():
-        # use all all variables from env as SQL template variables
-        sql_template = sql_template.replace("<{}>".format(key), str(var["value"]))
+def _do_load_data(cursor, db, migration, shard_id=None):
+    """Load CSV migration into its table: by COPY on PostgreSQL and LOAD DATA on MySQL.
+    Data is streamed from file by driver or server, it's neither parsed nor kept in memory.
+    """
+    table_template, columns, line_terminator, data_file = migration.open_data()
+    with data_file:
+        values = migration.get_variables(db)
+        if shard_id is not None:
+            values["shard_id"] = str(shard_id)
+        template = SqlTemplate(table_template, get_env_placeholder_re(db.env))
+        migration.check_placeholders(template.placeholders, values, db)
+        table = template.render(values)
+        if not CSV_TABLE_RE.match(table):
+            raise SdbInvalidConfig(
+                "CSV migration {} has invalid table `{}`".format(migration.full_name, table)
+            )
 
-    return sql_template
+        if db.type == DB_TYPE_POSTGRES:
+            cursor.copy_csv(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)".format(
+                    table, ", ".join('"{}"'.format(column) for column in columns)
+                ),
+                data_file,
+            )
+        elif db.type == DB_TYPE_MYSQL:
+            _load_mysql_data(cursor, db, migration, table, columns, line_terminator, data_file)
+        else:
+            raise ValueError("Invalid db type %s" % db.type)
+
+
+def _load_mysql_data(cursor, db, migration, table, columns, line_terminator, data_file):
+    # pylint: disable=too-many-arguments
+    # fields are read into variables, so empty ones are NULL the same way as in COPY
+    variables = ["@field{}".format(index) for index in range(len(columns))]
+    # the first two lines are table and CSV header
+    cursor.execute(
+        "LOAD DATA LOCAL INFILE %s INTO TABLE {} CHARACTER SET utf8mb4 "
+        "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+        "LINES TERMINATED BY %s IGNORE 2 LINES ({}) SET {}".format(
+            table,
+            ", ".join(variables),
+            ", ".join(
+                "`{}` = NULLIF({}, '')".format(column, variable)
+                for column, variable in zip(columns, variables)
+            ),
+        ),
+        [os.path.abspath(data_file.name), line_terminator],
+    )
+    # LOAD DATA LOCAL works like LOAD DATA IGNORE: duplicate and invalid rows are skipped
+    # or truncated with warnings, COPY fails on them
+    cursor.execute("SHOW WARNINGS")
+    warnings = [row for row in cursor.fetchall() if row[0] != "Note"]
+    if warnings:
+        raise SdbInvalidData(
+            "CSV migration {} has invalid rows on {}, LOAD DATA reported {} warning(s): {}".format(
+                migration.full_name, db, len(warnings),
+                "; ".join(str(row[2]) for row in warnings[:CSV_MAX_REPORTED_WARNINGS]),
+            )
+        )
 
 
-def split_sql(sql):
-    return [chunk for chunk in sqlparse.split(sql) if chunk != ""]
+def _do_apply_shards_concurrently(db_wrapper, db, migration, shard_ids, shard_jobs):
+    """Spread shards of NOTRX migration across pool of autocommit connections.
+    Every applied shard is recorded in _sdbmigrate_shard_progress.
+    The first failure stops taking new shards, the error is re-raised when all workers are done.
+    """
+    shard_queue = queue.Queue()
+    for shard_id in shard_ids:
+        shard_queue.put(shard_id)
+    stop_event = threading.Event()
+    errors = []
+
+    def worker(conn):
+        with conn.cursor() as cursor:
+            while not stop_event.is_set():
+                try:
+                    shard_id = shard_queue.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    _do_apply_one_shard_with_progress(db_wrapper, cursor, db, migration, shard_id)
+                except Exception as e:  # pylint: disable=broad-except
+                    logging.error("Unable to apply migration %s to shard %s on %s",
+                                  migration.full_name, shard_id, db)
+                    errors.append(e)
+                    stop_event.set()
+
+    connections = db_wrapper.get_notrx_pool(db, min(shard_jobs, len(shard_ids)))
+    logging.debug("Apply %s on %s using %s connections", migration.full_name, db, len(connections))
+    with ThreadPoolExecutor(max_workers=len(connections), thread_name_prefix="sdbmigrate-shard") as executor:
+        for future in [executor.submit(worker, conn) for conn in connections]:
+            future.result()
+
+    if errors:
+        raise errors[0]
+
+
+def _batch_query(batch):
+    # `;` is added on the next line, since statement may end with `-- comment`
+    return "\n".join(sql if sql.rstrip().endswith(";") else sql + "\n;" for _, sql in batch)
+
+
+def _execute_batch(cursor, db, batch):
+    """Execute list of (shard_id, sql) pairs in one round trip.
+    If batch fails the statement which caused it is logged with its shard_id.
+    """
+    if cursor.supports_pipeline:
+        failure = cursor.execute_pipeline([sql for _, sql in batch])
+        if failure is not None:
+            index, error = failure
+            shard_id, sql = batch[index]
+            logging.error("Failed statement on shard %s of %s:\n%s", shard_id, db, sql)
+            raise error
+    elif db.type == DB_TYPE_POSTGRES:
+        # statements of failed batch are re-run one by one after rollback to savepoint
+        # to find out the failed one, it's the same as applying them without batching
+        try:
+            cursor.execute("SAVEPOINT sdbmigrate_batch;\n{}\nRELEASE SAVEPOINT sdbmigrate_batch;".format(
+                _batch_query(batch)
+            ))
+        except Exception as e:  # pylint: disable=broad-except
+            cursor.execute("ROLLBACK TO SAVEPOINT sdbmigrate_batch")
+            for shard_id, sql in batch:
+                try:
+                    cursor.execute(sql)
+                except Exception:
+                    logging.error("Failed statement on shard %s of %s:\n%s", shard_id, db, sql)
+                    raise
+            # the batch itself was wrong, e.g. its statements can't be joined
+            logging.warning("Batch failed on %s, but its statements succeeded one by one: %s", db, e)
+    else:
+        _execute_mysql_batch(cursor, db, batch)
+
+
+def _execute_mysql_batch(cursor, db, batch):
+    attempt = 0
+    while True:
+        query = _batch_query(batch)
+        # MySQL reports result of every statement separately, so number of
+        # successfully fetched results points to the failed statement
+        statement_index = 0
+        try:
+            cursor.execute(query, retry=False)
+            statement_index += 1
+            while cursor.nextset():
+                statement_index += 1
+            return
+        except Exception as e:
+            shard_id, sql = batch[statement_index]
+            if cursor.lock_retry is None or not cursor.lock_retry.should_retry(e, attempt):
+                logging.error("Failed statement on shard %s of %s:\n%s", shard_id, db, sql)
+                raise
+            # statements before the failed one are committed in autocommit mode or stay
+            # in transaction, so only the rest of batch is retried
+            attempt += 1
+            cursor.lock_retry.wait(attempt, sql, e)
+            batch = batch[statement_index:]
+
+
+def _do_apply_shards_batched(cursor, db, migration, shard_ids, batch_size, on_shards_applied=None):
+    """
+    :param on_shards_applied: called with cursor and list of shard_ids
+                              which statements are all executed
+    """
+    template = migration.compile(db)
+    batch = []
+    # shards which statements are all in batch or already executed
+    rendered_shard_ids = []
+    for shard_id in shard_ids:
+        for sql_chunk in template.render(shard_id):
+            batch.append((shard_id, sql_chunk))
+            if len(batch) == batch_size:
+                _execute_batch(cursor, db, batch)
+                batch = []
+                if on_shards_applied is not None and rendered_shard_ids:
+                    on_shards_applied(cursor, rendered_shard_ids)
+                rendered_shard_ids = []
+        rendered_shard_ids.append(shard_id)
+    if batch:
+        _execute_batch(cursor, db, batch)
+    if on_shards_applied is not None and rendered_shard_ids:
+        on_shards_applied(cursor, rendered_shard_ids)
+
+
+def _get_shards_to_apply(sdbmigrate_state, cursor, db, migration):
+    """Return all shards of db for TRX migration and not applied yet ones for NOTRX migration"""
+    if migration.type1 != Migration.MIGRATION_TYPE1_NOTRX:
+        return db.shard_ids
+
+    db_wrapper = sdbmigrate_state["db_wrapper"]
+    if migration.version in (sdbmigrate_state["args"].reset_shard_progress or ()):
+        logging.info("Reset shard progress of migration %s on %s", migration.full_name, db)
+        db_wrapper.reset_shard_progress(cursor, db, migration)
+    return db_wrapper.get_pending_shards(cursor, db, migration)
 
 
-def _do_apply_one_migration(sdbmigrate_state, cursor, db, migration):
+def _do_apply_one_shard_with_progress(db_wrapper, cursor, db, migration, shard_id):
+    _do_apply_one_shard(cursor, db, migration, shard_id)
+    db_wrapper.set_shards_applied(cursor, db, migration, [shard_id])
+
+
+def _do_apply_shards(sdbmigrate_state, cursor, db, migration):
+    """Apply SHARD migration on all shards of db.
+    Shards of NOTRX migration are applied in autocommit mode one by one, so each of them
+    is recorded in _sdbmigrate_shard_progress and skipped when failed migration is rerun.
+    """
     db_wrapper = sdbmigrate_state["db_wrapper"]
+    args = sdbmigrate_state["args"]
+    is_resumable = migration.type1 == Migration.MIGRATION_TYPE1_NOTRX
+    shard_ids = _get_shards_to_apply(sdbmigrate_state, cursor, db, migration)
+
+    def on_shards_applied(shard_cursor, applied_shard_ids):
+        db_wrapper.set_shards_applied(shard_cursor, db, migration, applied_shard_ids)
+
+    shard_jobs = db_wrapper.get_shard_jobs(db)
+    batch_size = args.batch_statements
+    if migration.type1 == Migration.MIGRATION_TYPE1_NOTRX and shard_jobs > 1 and len(shard_ids) > 1:
+        _do_apply_shards_concurrently(db_wrapper, db, migration, shard_ids, shard_jobs)
+    elif (
+        batch_size > 1
+        and migration.lang == MIGRATION_LANG_SQL
+        # PostgreSQL runs multi-statement query as one implicit transaction,
+        # so statements like CREATE INDEX CONCURRENTLY can't be batched
+        and (migration.type1 == Migration.MIGRATION_TYPE1_TRX or db.type == DB_TYPE_MYSQL)
+    ):
+        _do_apply_shards_batched(
+            cursor, db, migration, shard_ids, batch_size, on_shards_applied if is_resumable else None
+        )
+    else:
+        for shard_id in shard_ids:
+            _do_apply_one_shard(cursor, db, migration, shard_id)
+            if is_resumable:
+                on_shards_applied(cursor, [shard_id])
+
+
+def _do_apply_one_migration(sdbmigrate_state, cursor, db, migration, set_applied=True):
+    """
+    :param set_applied: False means that caller is responsible for
+                        recording migration into _sdbmigrate_migrations
+    """
     if migration.type2 == Migration.MIGRATION_TYPE2_PLAIN:
         if migration.lang == MIGRATION_LANG_SQL:
-            migration_code_with_env = env_query(migration.code, db.env)
-            for sql_chunk in split_sql(migration_code_with_env):
+            if migration.is_streamed(sdbmigrate_state["args"].stream_sql_min_size * 1024 * 1024):
+                sql_chunks = migration.iter_statements(db)
+            else:
+                sql_chunks = migration.compile(db).render()
+            for sql_chunk in sql_chunks:
                 logging.debug("sql_chunk is %s", sql_chunk)
-                cursor.execute(Sql(sql_chunk).resolve_for(db))
+                cursor.execute(sql_chunk)
         elif migration.lang == MIGRATION_LANG_PYTHON:
-            exec(migration.code, {"cursor": cursor, "env": db.env})
+            exec(migration.compile_python(), {"cursor": cursor, "env": db.env})
+        elif migration.lang == MIGRATION_LANG_CSV:
+            _do_load_data(cursor, db, migration)
         else:
             raise SdbMigrateError(
                 "Unsupported migration code language: `{}`".format(migration.lang)
             )
 
     elif migration.type2 == Migration.MIGRATION_TYPE2_SHARD:
-        for shard_id in db.shard_ids:
-            migration_code_with_env = env_query(migration.code, db.env)
-            if migration.lang == MIGRATION_LANG_SQL:
-                for sql_chunk in split_sql(migration_code_with_env):
-                    logging.debug("sharded sql_chunk is %s", sql_chunk)
-                    cursor.execute(shard_query(Sql(sql_chunk).resolve_for(db), shard_id))
-            elif migration.lang == MIGRATION_LANG_PYTHON:
-                exec(
-                    migration.code,
-                    {"cursor": cursor, "shard_id": shard_id, "env": db.env},
-                )
-            else:
-                raise SdbMigrateError(
-                    "Unsupported migration code language: `{}`".format(migration.lang)
-                )
+        _do_apply_shards(sdbmigrate_state, cursor, db, migration)
     else:
         raise SdbInvalidConfig("unsupported migration type2 {}".format(migration.type2))
 
-    db_wrapper.set_migration_applied(cursor, db, migration)
+    _record_migration_applied(sdbmigrate_state, cursor, db, migration, set_applied)
+
+
+def _record_migration_applied(sdbmigrate_state, cursor, db, migration, set_applied=True):
+    db_wrapper = sdbmigrate_state["db_wrapper"]
+    if set_applied:
+        db_wrapper.set_migration_applied(cursor, db, migration)
+    if (
+        migration.type1 == Migration.MIGRATION_TYPE1_NOTRX
+        and migration.type2 == Migration.MIGRATION_TYPE2_SHARD
+    ):
+        # progress is not needed anymore when migration is recorded as applied
+        db_wrapper.reset_shard_progress(cursor, db, migration)
     db.schema_version = migration.version
     logging.info("Migration %s was applied on %s", migration.full_name, db)
 
@@ -914,20 +2926,42 @@ def generate_next_migration(sdbmigrate_state, migrations):
 
 
 def apply_migration(sdbmigrate_state, db: DbSession, migration: Migration):
+    with measure(db.timings, "migration", db=str(db), migration=migration.full_name):
+        _do_apply_migration(sdbmigrate_state, db, migration)
+
+
+def _do_apply_trx_migration(sdbmigrate_state, db: DbSession, migration: Migration):
+    # apply migration step transactionally
+    # using context manager
+    with db.trx_conn as db_conn:
+        with db_conn.cursor() as cursor:
+            _do_apply_one_migration(sdbmigrate_state, cursor, db, migration)
+        if sdbmigrate_state["args"].dry_run:
+            logging.info(
+                "Rollback migration %s on %s because of ---dry-run",
+                migration.full_name,
+                db,
+            )
+            db_conn.rollback()
+
+
+def retry_transaction(db: DbSession, description, func, *args):
+    """Call func applying transaction on db, retry it as a whole after lock timeout.
+    Only PostgreSQL rolls back transaction completely, on MySQL failed statements
+    are retried by cursor of transaction connection instead.
+    """
+    if db.type == DB_TYPE_POSTGRES:
+        return db.lock_retry.call(description, func, *args)
+    return func(*args)
+
+
+def _do_apply_migration(sdbmigrate_state, db: DbSession, migration: Migration):
     is_dry_run = sdbmigrate_state["args"].dry_run
     if migration.type1 == Migration.MIGRATION_TYPE1_TRX:
-        # apply migration step transactionally
-        # using context manager
-        with db.trx_conn as db_conn:
-            with db_conn.cursor() as cursor:
-                _do_apply_one_migration(sdbmigrate_state, cursor, db, migration)
-            if is_dry_run:
-                logging.info(
-                    "Rollback migration %s on %s because of ---dry-run",
-                    migration.full_name,
-                    db,
-                )
-                db_conn.rollback()
+        retry_transaction(
+            db, "transaction of {}".format(migration.full_name),
+            _do_apply_trx_migration, sdbmigrate_state, db, migration,
+        )
 
     elif migration.type1 == Migration.MIGRATION_TYPE1_NOTRX:
         # apply migration step without transaction(autocommit=True)
@@ -944,6 +2978,383 @@ def apply_migration(sdbmigrate_state, db: DbSession, migration: Migration):
         raise SdbInvalidConfig("unsupported migration type1 {}".format(migration.type1))
 
 
+class DbApplyResult:
+    """Outcome of applying the migration sequence to one database"""
+
+    def __init__(self, db):
+        self.db = db
+        self.applied = []
+        self.failed_migration = None
+        self.error = None
+        self.skipped = False
+
+    @property
+    def is_failed(self):
+        return self.error is not None
+
+    def __str__(self):
+        if self.is_failed:
+            status = "FAILED on {}: {}".format(self.failed_migration.full_name, self.error)
+        elif self.skipped:
+            status = "skipped"
+        else:
+            status = "ok"
+        summary = "{}: {}, applied {} migration(s), schema_version {}".format(
+            self.db, status, len(self.applied), self.db.schema_version
+        )
+        if self.db.lock_retry.count:
+            summary += ", {} retries after lock timeout".format(self.db.lock_retry.count)
+        return summary
+
+
+def apply_migration_group(sdbmigrate_state, db: DbSession, migrations):
+    """Apply several TRX migrations in one transaction and record them by one insert"""
+    group_name = "{}..{}".format(migrations[0].full_name, migrations[-1].full_name)
+    with measure(db.timings, "migration", db=str(db), migration=group_name):
+        retry_transaction(
+            db, "transaction of {}".format(group_name),
+            _do_apply_migration_group, sdbmigrate_state, db, migrations,
+        )
+
+
+def _do_apply_migration_group(sdbmigrate_state, db: DbSession, migrations):
+    db_wrapper = sdbmigrate_state["db_wrapper"]
+    with db.trx_conn as db_conn:
+        with db_conn.cursor() as cursor:
+            for migration in migrations:
+                _do_apply_one_migration(sdbmigrate_state, cursor, db, migration, set_applied=False)
+            db_wrapper.set_migrations_applied(cursor, db, migrations)
+        if sdbmigrate_state["args"].dry_run:
+            logging.info(
+                "Rollback migrations %s..%s on %s because of ---dry-run",
+                migrations[0].full_name,
+                migrations[-1].full_name,
+                db,
+            )
+            db_conn.rollback()
+
+
+def group_migrations(migrations, max_group_size):
+    """Split migrations into groups which are applied in one transaction.
+    Only consecutive TRX migrations are grouped, every other migration is a group itself.
+    """
+    groups = []
+    for migration in migrations:
+        if (
+            groups
+            and migration.type1 == Migration.MIGRATION_TYPE1_TRX
+            and groups[-1][-1].type1 == Migration.MIGRATION_TYPE1_TRX
+            and len(groups[-1]) < max_group_size
+        ):
+            groups[-1].append(migration)
+        else:
+            groups.append([migration])
+    return groups
+
+
+def get_pending_migrations(sdbmigrate_state, db, migrations):
+    """Return migrations which should be applied to db taking into account --target-schema-version"""
+    target_schema_version = sdbmigrate_state["args"].target_schema_version
+    schema_version = db.schema_version
+    pending_migrations = []
+    for migration in migrations:
+        if target_schema_version is not None and schema_version >= target_schema_version:
+            logging.info(
+                "Target schema version %s was reached on %s. Stop further migrations.",
+                migration.full_name,
+                db,
+            )
+            break
+
+        if schema_version >= migration.version:
+            logging.debug("Migration %s was already applied on %s", migration.full_name, db)
+            continue
+        pending_migrations.append(migration)
+        schema_version = migration.version
+
+    return pending_migrations
+
+
+class HostScheduler:  # pylint: disable=too-few-public-methods
+    """Runs function for every database by pool of workers, so that no more than
+    max_per_host databases of the same server(host:port) are processed at the same time.
+    Databases are taken in config order, ones of busy servers are skipped until
+    a slot of their server is released, so other servers don't wait for them.
+    """
+
+    def __init__(self, jobs, max_per_host=None):
+        self.jobs = jobs
+        self.max_per_host = max_per_host or jobs
+        self._condition = threading.Condition()
+        self._pending = []
+        self._busy = {}
+
+    def _take(self):
+        """Return the next database which server has free slot or None if all are taken"""
+        with self._condition:
+            while self._pending:
+                for index, db in enumerate(self._pending):
+                    if self._busy.get(db.endpoint, 0) < self.max_per_host:
+                        self._busy[db.endpoint] = self._busy.get(db.endpoint, 0) + 1
+                        return self._pending.pop(index)
+                self._condition.wait()
+            return None
+
+    def _release(self, db):
+        with self._condition:
+            self._busy[db.endpoint] -= 1
+            self._condition.notify_all()
+
+    def run(self, func, db_sessions):
+        """Call func(db) for all db_sessions and return results in the same order"""
+        self._pending = list(db_sessions)
+        results = {}
+
+        def worker():
+            while True:
+                db = self._take()
+                if db is None:
+                    return
+                try:
+                    results[id(db)] = func(db)
+                finally:
+                    self._release(db)
+
+        workers = max(min(self.jobs, len(db_sessions)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sdbmigrate") as executor:
+            for future in [executor.submit(worker) for _ in range(workers)]:
+                future.result()
+        return [results[id(db)] for db in db_sessions]
+
+
+class AsyncEngine:
+    """Applies migrations to all databases from one asyncio event loop.
+    Every database is a task, shards of NOTRX_SHARD migration are spread across tasks
+    of its connection pool. Database drivers and Python migrations are blocking, so their
+    calls are run by bounded executor: number of OS threads doesn't grow with number of
+    databases and shard connections, it's `workers`.
+    Semantics of applying every migration is the same as with threads.
+    """
+
+    def __init__(self, sdbmigrate_state, workers):
+        self.sdbmigrate_state = sdbmigrate_state
+        self.db_wrapper = sdbmigrate_state["db_wrapper"]
+        self.args = sdbmigrate_state["args"]
+        self.workers = workers
+        self._executor = None
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    async def run_blocking_for(self, db, migration, func, *args):
+        """Run blocking call, records of its statements are labeled by db and migration"""
+        def call():
+            if db.timings is None:
+                return func(*args)
+            with db.timings.labels(db=str(db), migration=migration.full_name):
+                return func(*args)
+
+        return await self.run_blocking(call)
+
+    async def run_with_notrx_cursor(self, db, migration, func):
+        """Run blocking func(sdbmigrate_state, cursor, db, migration) with cursor of autocommit
+        connection of db. Cursor is taken in executor too: shared MySQL connection may be opened for it.
+        """
+        def call():
+            with db.notrx_conn.cursor() as cursor:
+                return func(self.sdbmigrate_state, cursor, db, migration)
+
+        return await self.run_blocking_for(db, migration, call)
+
+    def apply_migrations(self, migrations, stop_event):
+        """Return DbApplyResult of every database in order of db_sessions"""
+        return asyncio.run(self._apply_all(migrations, stop_event))
+
+    async def _apply_all(self, migrations, stop_event):
+        db_sessions = self.db_wrapper.db_sessions
+        jobs = asyncio.Semaphore(self.args.jobs)
+        max_per_host = self.db_wrapper.sdbmigrate_config.get("max_concurrent_per_host") or self.args.jobs
+        host_slots = {db.endpoint: asyncio.Semaphore(max_per_host) for db in db_sessions}
+
+        async def apply_db(db):
+            # slot of server is taken first, so waiting for it doesn't hold a job
+            async with host_slots[db.endpoint], jobs:
+                return await self._apply_db(db, migrations, stop_event)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sdbmigrate-async") as executor:
+            self._executor = executor
+            return await asyncio.gather(*[apply_db(db) for db in db_sessions])
+
+    async def _apply_db(self, db, migrations, stop_event):
+        """The same as apply_db_migrations"""
+        result = DbApplyResult(db)
+        for group in get_pending_groups(self.sdbmigrate_state, db, migrations):
+            if stop_event.is_set():
+                logging.info("Skip further migrations on %s because of failure on other database", db)
+                result.skipped = True
+                break
+
+            schema_version = db.schema_version
+            try:
+                await self._apply_group(db, group)
+            except Exception as e:  # pylint: disable=broad-except
+                set_group_failed(self.sdbmigrate_state, result, group, schema_version, e, stop_event)
+                break
+            result.applied.extend(group)
+        return result
+
+    async def _apply_group(self, db, group):
+        migration = group[0]
+        if len(group) > 1:
+            await self.run_blocking(apply_migration_group, self.sdbmigrate_state, db, group)
+        elif (
+            migration.type1 == Migration.MIGRATION_TYPE1_NOTRX
+            and migration.type2 == Migration.MIGRATION_TYPE2_SHARD
+            and self.db_wrapper.get_shard_jobs(db) > 1
+            and not self.args.dry_run
+        ):
+            started = time.perf_counter()
+            failed = True
+            try:
+                await self._apply_shards_concurrently(db, migration)
+                failed = False
+            finally:
+                # measure() can't be used, its labels are thread-local and shared by all tasks
+                if db.timings is not None:
+                    db.timings.add(
+                        "migration", time.perf_counter() - started, failed,
+                        db=str(db), migration=migration.full_name,
+                    )
+        else:
+            await self.run_blocking(apply_migration, self.sdbmigrate_state, db, migration)
+
+    async def _apply_shards_concurrently(self, db, migration):
+        """The same as _do_apply_shards_concurrently with task per connection instead of thread"""
+        shard_ids = await self.run_with_notrx_cursor(db, migration, _get_shards_to_apply)
+        pool_size = max(min(self.db_wrapper.get_shard_jobs(db), len(shard_ids)), 1)
+        connections = await self.run_blocking(self.db_wrapper.get_notrx_pool, db, pool_size)
+        logging.debug("Apply %s on %s using %s connections", migration.full_name, db, len(connections))
+        shard_queue = list(reversed(shard_ids))
+        errors = []
+
+        def apply_shard(conn, shard_id):
+            with conn.cursor() as shard_cursor:
+                _do_apply_one_shard_with_progress(self.db_wrapper, shard_cursor, db, migration, shard_id)
+
+        async def worker(conn):
+            while shard_queue and not errors:
+                shard_id = shard_queue.pop()
+                try:
+                    await self.run_blocking(apply_shard, conn, shard_id)
+                except Exception as e:  # pylint: disable=broad-except
+                    logging.error("Unable to apply migration %s to shard %s on %s",
+                                  migration.full_name, shard_id, db)
+                    errors.append(e)
+
+        await asyncio.gather(*[worker(conn) for conn in connections])
+        if errors:
+            raise errors[0]
+
+        await self.run_with_notrx_cursor(db, migration, _record_migration_applied)
+
+
+def apply_db_migrations(sdbmigrate_state, db, migrations, stop_event):
+    """Apply migrations in version order to a single database.
+
+    :param stop_event: threading.Event, which is set by another database
+                       failed in fail-fast mode; pending migrations are skipped then
+    :return: DbApplyResult
+    """
+    result = DbApplyResult(db)
+    for group in get_pending_groups(sdbmigrate_state, db, migrations):
+        if stop_event.is_set():
+            logging.info("Skip further migrations on %s because of failure on other database", db)
+            result.skipped = True
+            break
+
+        schema_version = db.schema_version
+        try:
+            if len(group) == 1:
+                apply_migration(sdbmigrate_state, db, group[0])
+            else:
+                apply_migration_group(sdbmigrate_state, db, group)
+        except Exception as e:  # pylint: disable=broad-except
+            set_group_failed(sdbmigrate_state, result, group, schema_version, e, stop_event)
+            break
+        result.applied.extend(group)
+
+    return result
+
+
+def get_pending_groups(sdbmigrate_state, db, migrations):
+    args = sdbmigrate_state["args"]
+    max_group_size = 1
+    # DDL commits implicitly on MySQL, so migrations of failed group may be applied already,
+    # there every migration is applied and recorded separately
+    if args.group_transactions and db.type == DB_TYPE_POSTGRES:
+        max_group_size = args.max_group_size
+    return group_migrations(get_pending_migrations(sdbmigrate_state, db, migrations), max_group_size)
+
+
+def set_group_failed(sdbmigrate_state, result, group, schema_version, error, stop_event):
+    # pylint: disable=too-many-arguments
+    db = result.db
+    # the whole group is rolled back, migrations before the failed one as well
+    failed_migration = next((m for m in group if m.version > db.schema_version), group[-1])
+    db.schema_version = schema_version
+    logging.error('Unable to apply migration %s to %s. Please review migration code.',
+                  failed_migration.full_name, db)
+    result.failed_migration = failed_migration
+    result.error = error
+    if sdbmigrate_state["args"].on_error == ON_ERROR_FAIL_FAST:
+        stop_event.set()
+
+
+def is_drift_checked(args):
+    """Checksums of applied migrations are compared only with --manifest, which reads only
+    changed files, or with --check-drift, which reads all applied migrations
+    """
+    return bool(args.manifest or args.check_drift)
+
+
+def get_drifted_migrations(db, migrations):
+    """Return names of migrations applied to db, whose files were changed after that.
+    Migrations applied before checksums were recorded are not checked.
+    """
+    migrations_by_version = {migration.version: migration for migration in migrations}
+    drifted = []
+    for applied_migration in db.migrations:
+        migration = migrations_by_version.get(applied_migration.version)
+        if (
+            migration is not None
+            and applied_migration.checksum is not None
+            and applied_migration.checksum != migration.checksum
+        ):
+            drifted.append(applied_migration.full_name)
+    return drifted
+
+
+def check_drift(sdbmigrate_state, migrations):
+    """Fail if files of applied migrations were changed, unless --allow-drift is specified"""
+    if not is_drift_checked(sdbmigrate_state["args"]):
+        return
+
+    drifted_dbs = []
+    for db in sdbmigrate_state["db_wrapper"].db_sessions:
+        drifted = get_drifted_migrations(db, migrations)
+        if drifted:
+            logging.error("Applied migrations were changed since they were applied on %s: %s",
+                          db, ", ".join(drifted))
+            drifted_dbs.append(db)
+
+    if drifted_dbs and not sdbmigrate_state["args"].allow_drift:
+        raise SdbMigrateError(
+            "Applied migrations were changed on {} databases, revert the changes "
+            "or use --allow-drift".format(len(drifted_dbs))
+        )
+
+
 def apply_migrations(sdbmigrate_state, migrations):
     """
     :param sdbmigrate_state: dictionary with various sdbmigrate settings
@@ -951,31 +3362,94 @@ def apply_migrations(sdbmigrate_state, migrations):
     :return:
     """
     db_wrapper = sdbmigrate_state["db_wrapper"]
-    target_schema_version = sdbmigrate_state["args"].target_schema_version
+    jobs = sdbmigrate_state["args"].jobs
+    max_per_host = db_wrapper.sdbmigrate_config.get("max_concurrent_per_host")
+    stop_event = threading.Event()
 
-    for db in db_wrapper.db_sessions:
-        for migration in migrations:
-            if target_schema_version is not None and db.schema_version >= target_schema_version:
-                logging.info(
-                    "Target schema version %s was reached on %s. Stop further migrations.",
-                    migration.full_name,
-                    db,
-                )
-                break
+    check_drift(sdbmigrate_state, migrations)
 
-            if db.schema_version >= migration.version:
-                logging.debug("Migration %s was already applied on %s", migration.full_name, db)
-                continue
-            try:
-                apply_migration(sdbmigrate_state, db, migration)
-            except Exception as e:
-                logging.error('Unable to apply migration %s to %s. Please review migration code.',
-                              migration.full_name, db)
-                raise e
+    if db_wrapper.db_sessions:
+        min_schema_version = min(db.schema_version for db in db_wrapper.db_sessions)
+        migrations = [migration for migration in migrations if migration.version > min_schema_version]
+        logging.debug("Pending migrations above schema version %s: %s", min_schema_version, len(migrations))
 
+    # applied migrations are not read at all, pending ones are read before the rollout
+    stream_min_size = sdbmigrate_state["args"].stream_sql_min_size * 1024 * 1024
+    for migration in migrations:
+        migration.check_readable(stream_min_size)
+
+    if sdbmigrate_state["args"].engine == ENGINE_ASYNCIO:
+        results = AsyncEngine(sdbmigrate_state, sdbmigrate_state["args"].async_workers).apply_migrations(
+            migrations, stop_event
+        )
+    elif jobs > 1 and len(db_wrapper.db_sessions) > 1:
+        # every database is processed by one worker, migrations inside one database
+        # are still applied sequentially
+        results = HostScheduler(jobs, max_per_host).run(
+            lambda db: apply_db_migrations(sdbmigrate_state, db, migrations, stop_event),
+            db_wrapper.db_sessions,
+        )
+    else:
+        results = [
+            apply_db_migrations(sdbmigrate_state, db, migrations, stop_event)
+            for db in db_wrapper.db_sessions
+        ]
+
+    failed_results = [result for result in results if result.is_failed]
+    if len(results) > 1 or failed_results:
+        for result in results:
+            logging.info("Summary for %s", result)
+
+    if failed_results:
+        raise failed_results[0].error
+
+
+def print_migrations_status(sdbmigrate_state, migrations):
+    """
+    Print JSON report with pending migrations of every database.
+    :param sdbmigrate_state: dictionary with various sdbmigrate settings
+    :param migrations: list of migrations from migrations directory
+    """
+    db_wrapper = sdbmigrate_state["db_wrapper"]
+    workers = max(min(len(db_wrapper.db_sessions), MAX_CONNECT_WORKERS), 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sdbmigrate-status") as executor:
+        futures = [
+            executor.submit(db_wrapper.get_db_status, db, migrations) for db in db_wrapper.db_sessions
+        ]
+        databases = [future.result() for future in futures]
+
+    report = {
+        "last_version": migrations[-1].version if migrations else -1,
+        "pending_count": sum(len(status["pending"]) for status in databases),
+        "databases": databases,
+    }
+    sys.stdout.write(json.dumps(report, indent=2) + "\n")
+
+
+def positive_int(value):
+    """argparse type for options like --jobs"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid int value: `{}`".format(value))
+    if number < 1:
+        raise argparse.ArgumentTypeError("should be positive, got `{}`".format(value))
+    return number
+
+
+def non_negative_int(value):
+    """argparse type for options like --lock-retries"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid int value: `{}`".format(value))
+    if number < 0:
+        raise argparse.ArgumentTypeError("should be non-negative, got `{}`".format(value))
+    return number
 
-def main():
-    """Entry point for sdbmigrate"""
+
+def create_argument_parser():
+    """Command line arguments of sdbmigrate"""
 
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
@@ -989,7 +3463,7 @@ def main():
         "--action",
         "-a",
         default="apply",
-        choices=("apply", "generate"),
+        choices=("apply", "generate", "status"),
         help="Specify action which will be performed during script run.",
     )
     parser.add_argument(
@@ -1034,15 +3508,210 @@ def main():
         action="store_true",
         help="For update sdbmigrate env variables(by default they are frozen)",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=positive_int,
+        default=1,
+        help=(
+            "Number of databases to apply migrations on concurrently. "
+            "Databases of one server are limited by max_concurrent_per_host in config"
+        ),
+    )
+    parser.add_argument(
+        "--engine",
+        default=ENGINE_THREADS,
+        choices=(ENGINE_THREADS, ENGINE_ASYNCIO),
+        help=(
+            "How databases and shards are applied concurrently: thread per database and per shard "
+            "connection or tasks of one asyncio event loop with --async-workers threads for database calls"
+        ),
+    )
+    parser.add_argument(
+        "--async-workers",
+        type=positive_int,
+        default=MAX_CONNECT_WORKERS,
+        help="Max number of database calls running at the same time with --engine asyncio",
+    )
+    parser.add_argument(
+        "--shard-jobs",
+        type=positive_int,
+        default=1,
+        help=(
+            "Number of shards of NOTRX_SHARD migration to apply concurrently on every database, "
+            "each using own autocommit connection. Capped by max_shard_jobs of database in config"
+        ),
+    )
+    parser.add_argument(
+        "--batch-statements",
+        type=positive_int,
+        default=1,
+        help=(
+            "Send up to N statements of SQL shard migration in one round trip, "
+            "they are sent in pipeline mode for databases with `driver: psycopg`. "
+            "It's not used for NOTRX migrations on PostgreSQL"
+        ),
+    )
+    parser.add_argument(
+        "--stream-sql-min-size",
+        type=positive_int,
+        default=64,
+        metavar="MB",
+        help=(
+            "PLAIN SQL migrations of this size or larger are read and executed statement by statement "
+            "instead of loading the whole file into memory"
+        ),
+    )
+    parser.add_argument(
+        "--group-transactions",
+        default=False,
+        action="store_true",
+        help="Apply consecutive TRX migrations in one transaction per database, only on PostgreSQL",
+    )
+    parser.add_argument(
+        "--max-group-size",
+        type=positive_int,
+        default=100,
+        help="Max number of TRX migrations applied in one transaction with --group-transactions",
+    )
+    parser.add_argument(
+        "--lock-retries",
+        type=non_negative_int,
+        default=None,
+        help=(
+            "How many times statement is retried if it failed because of lock_timeout from config, "
+            "{} by default for databases with lock_timeout and 0 for others. Whole transaction is "
+            "retried for TRX migrations on PostgreSQL, single statement - for NOTRX ones and on MySQL. "
+            "CREATE INDEX CONCURRENTLY is not retried, it leaves INVALID index after failure"
+        ).format(DEFAULT_LOCK_RETRIES),
+    )
+    parser.add_argument(
+        "--lock-retry-delay",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Delay before the first retry after lock timeout, it's doubled with random jitter for next ones",
+    )
+    parser.add_argument(
+        "--reset-shard-progress",
+        type=int,
+        action="append",
+        metavar="VERSION",
+        help=(
+            "Forget shards of NOTRX_SHARD migration VERSION which were applied by previous failed run, "
+            "so it's applied on all shards again. May be specified several times"
+        ),
+    )
+    parser.add_argument(
+        "--on-error",
+        default=ON_ERROR_FAIL_FAST,
+        choices=(ON_ERROR_FAIL_FAST, ON_ERROR_CONTINUE),
+        help=(
+            "What to do with other databases when migration failed on one of them: "
+            "stop applying further migrations or continue and report all failures at the end"
+        ),
+    )
+    parser.add_argument(
+        "--parse-cache",
+        type=str,
+        metavar="DIR",
+        help=(
+            "Directory for caching statement boundaries of SQL migrations and compiled "
+            "Python migrations between runs. Entries are keyed by migration content and parser version"
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        metavar="FILE",
+        help=(
+            "JSON index of migrations directory with checksums of files. It's updated on every run, "
+            "only files with changed size or mtime are read"
+        ),
+    )
+    parser.add_argument(
+        "--check-drift",
+        default=False,
+        action="store_true",
+        help=(
+            "Check that files of applied migrations were not changed after they were applied, "
+            "all of them are read. With --manifest it's checked by default and only changed files are read"
+        ),
+    )
+    parser.add_argument(
+        "--allow-drift",
+        default=False,
+        action="store_true",
+        help="Only log migrations which were changed after they were applied instead of failing",
+    )
+    parser.add_argument(
+        "--sql-splitter",
+        default=SQL_SPLITTER_BUILTIN,
+        choices=(SQL_SPLITTER_BUILTIN, SQL_SPLITTER_SQLPARSE),
+        help=(
+            "How SQL migrations are split into statements: by built-in one pass splitter, "
+            "which also supports MySQL DELIMITER command, or by sqlparse.split"
+        ),
+    )
+    parser.add_argument(
+        "--strict-placeholders",
+        default=False,
+        action="store_true",
+        help=(
+            "Fail SQL migration with <placeholder> which is not an env variable, db_schema or shard_id "
+            "instead of warning and keeping it as is"
+        ),
+    )
+    parser.add_argument(
+        "--timing-report",
+        type=str,
+        metavar="FILE",
+        help=(
+            "Write JSON report with durations of connections, migrations, shards and statements "
+            "with the slowest ones per database"
+        ),
+    )
+    parser.add_argument(
+        "--timing-top",
+        type=positive_int,
+        default=10,
+        help="Number of the slowest migrations, shards and statements in --timing-report",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        metavar="FILE",
+        help=(
+            "Write Prometheus metrics of the run(migration durations, statements, shards, errors "
+            "and schema versions) to FILE periodically, e.g. for node_exporter textfile collector"
+        ),
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=positive_int,
+        default=15,
+        help="Seconds between writes of --metrics-file during the run",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=positive_int,
+        metavar="PORT",
+        help="Serve OpenMetrics/Prometheus metrics of the run on http://127.0.0.1:PORT/metrics",
+    )
     parser.add_argument(
         "--migrate-state-schema",
         type=str,
         help=("Specify custom schema name for migration state. "
               "This option is supported only for PostgreSQL.")
     )
+    return parser
+
+
+def main():
+    """Entry point for sdbmigrate"""
 
     # parse command line arguments
-    args = parser.parse_args()
+    args = create_argument_parser().parse_args()
 
     # configure python logging using level from command line
     logging.basicConfig(
@@ -1051,20 +3720,53 @@ def main():
     )
 
     sdbmigrate_config = load_sdbmigrate_config(args.config_file)
-    migrations = load_migrations(args.migrations_dir)
-    sdbmigrate_state = {"args": args}
-
-    if args.action in ("apply", ):
-        db_wrapper = DbWrapper(args, sdbmigrate_config)
-        db_wrapper.init_sdbmigrate_state()
-        sdbmigrate_state["db_wrapper"] = db_wrapper
-
-    # run specified action
-    action_map = {
-        'apply': apply_migrations,
-        'generate': generate_next_migration,
-    }
-    action_map[args.action](sdbmigrate_state, migrations)
+    parse_cache = ParseCache(args.parse_cache) if args.parse_cache else None
+    manifest = MigrationManifest(args.manifest) if args.manifest else None
+    migrations = load_migrations(
+        args.migrations_dir, parse_cache, args.sql_splitter, args.strict_placeholders, manifest
+    )
+    if manifest is not None:
+        manifest.update(migrations)
+        manifest.write()
+    metrics_enabled = bool(args.metrics_file or args.metrics_port)
+    timings = None
+    if args.timing_report or metrics_enabled:
+        timings = TimingRecorder(summarize=bool(args.timing_report), top=args.timing_top)
+    metrics = MetricsExporter(timings) if metrics_enabled else None
+    sdbmigrate_state = {"args": args, "timings": timings}
+
+    try:
+        if metrics is not None:
+            metrics.start(args.metrics_file, args.metrics_port, args.metrics_interval)
+
+        if args.action in ("apply", ):
+            db_wrapper = DbWrapper(
+                args, sdbmigrate_config, timings=timings,
+                local_infile=any(migration.lang == MIGRATION_LANG_CSV for migration in migrations),
+            )
+            if metrics is not None:
+                metrics.db_sessions = db_wrapper.db_sessions
+            db_wrapper.init_sdbmigrate_state()
+            sdbmigrate_state["db_wrapper"] = db_wrapper
+        elif args.action in ("status", ):
+            sdbmigrate_state["db_wrapper"] = DbWrapper(
+                args, sdbmigrate_config, read_only=True, timings=timings
+            )
+
+        # run specified action
+        action_map = {
+            'apply': apply_migrations,
+            'generate': generate_next_migration,
+            'status': print_migrations_status,
+        }
+        action_map[args.action](sdbmigrate_state, migrations)
+    finally:
+        # timings are written for failed runs too, it's when they are needed most of all
+        if metrics is not None:
+            metrics.stop(args.metrics_file)
+        if args.timing_report:
+            timings.write_report(args.timing_report)
+            logging.info("Timing report is written to %s", args.timing_report)
 
 
 if __name__ == "__main__":
@@ -24,6 +24,7 @@ echo "CREATE DATABASE IF NOT EXISTS sdbmigrate1_behave; \
       CREATE DATABASE IF NOT EXISTS sdbmigrate_behave_simple; \
       CREATE USER IF NOT EXISTS 'test_behave'@'%' IDENTIFIED BY 'test_behave'; \
       GRANT ALL PRIVILEGES ON *.* TO 'test_behave'@'%'; \
+      SET GLOBAL local_infile = 1; \
       FLUSH PRIVILEGES;" | mysql -u root
 
 cd /sdbmigrate
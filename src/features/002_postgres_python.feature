@@ -78,3 +78,17 @@ Feature: Migrations in Python
     And sdbmigrate state has correct migrations
 
 
+  Scenario: Traceback of failed python migration points to migration file
+    Given migration dir
+    And add migration V0000__TRX_SHARD__broken.py
+    """
+    global cursor
+    global shard_id
+    raise ValueError('broken shard {}'.format(shard_id))
+    """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --parse-cache tmp/parse_cache
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with V0000__TRX_SHARD__broken.py", line 3
+    And sdbmigrate.py failed with ValueError: broken shard 0
@@ -78,3 +78,14 @@ Feature: Various validation & checks
     And failed sdbmigrate.py run with defaults
     Then sdbmigrate.py "failed"
     And sdbmigrate.py failed with Wrong migration name
+
+  Scenario: Unreachable database is reported
+    Given migration dir
+    And migrations
+      | file                       | code       |
+      | V0000__TRX_PLAIN__base.sql | SELECT 1;  |
+    And postgres_unreachable.yaml config
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with __main__.SdbConnectionError: Unable to connect to 1 of 2 database(s)
+    And sdbmigrate.py failed with DB[host=127.0.0.1, port=1, name=sdbmigrate2_behave]
@@ -26,4 +26,39 @@ Feature: Simple config
     Then sdbmigrate.py "succeeded"
     And database has initialized sdbmigrate state schema
     And sdbmigrate state has correct migrations
-    And sdbmigrate state has correct env
\ No newline at end of file
+    And sdbmigrate state has correct env
+  @postgres
+  Scenario: Repeated run with initialized state for PostgreSQL
+    Given migration dir
+    And migrations
+      | file                       | code      |
+      | V0000__TRX_PLAIN__base.sql | CREATE TABLE test (id int); |
+    And postgres_simple.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Given add migration V0001__TRX_PLAIN__base.sql
+      """
+      SELECT * FROM test;
+      """
+    And successful sdbmigrate.py run with args --jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct env
+
+  @mysql
+  Scenario: Repeated run with initialized state for MySQL
+    Given migration dir
+    And migrations
+      | file                       | code      |
+      | V0000__TRX_PLAIN__base.sql | CREATE TABLE test (id int); |
+    And mysql_simple.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Given add migration V0001__TRX_PLAIN__base.sql
+      """
+      SELECT * FROM test;
+      """
+    And successful sdbmigrate.py run with args --jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct env
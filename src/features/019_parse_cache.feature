@@ -0,0 +1,54 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+@postgres
+Feature: Cache of parsed SQL migrations
+  Scenario: Apply migrations twice with the same parse cache
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__procedures.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      CREATE OR REPLACE FUNCTION test_count() RETURNS bigint AS $$
+      BEGIN
+        RETURN (SELECT count(*) FROM test);
+      END;
+      $$ LANGUAGE plpgsql;
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --parse-cache tmp/parse_cache
+    Then sdbmigrate.py "succeeded"
+    And plain table was created with name "test"
+    Given init databases
+    And successful sdbmigrate.py run with args --parse-cache tmp/parse_cache
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+
+  Scenario: Parse cache entries of wrong shape are ignored
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      CREATE TABLE IF NOT EXISTS test2 (id bigint);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --parse-cache tmp/parse_cache_broken
+    Then sdbmigrate.py "succeeded"
+    Given parse cache tmp/parse_cache_broken has entries of wrong shape
+    And init databases
+    And successful sdbmigrate.py run with args --parse-cache tmp/parse_cache_broken
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate.py log contains Ignore broken parse cache entry
+    And plain table was created with name "test2"
@@ -0,0 +1,90 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Batched statements of sharded SQL migrations
+  @postgres
+  Scenario: Apply TRX_SHARD migration on PostgreSQL in batches
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES (<shard_id>);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+    And sharded table with name "test_<shard_id>" is NOT empty
+
+  @postgres
+  Scenario: Failed statement in batch is reported with its shard
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES ('not a number <shard_id>');
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Failed statement on shard 0
+    And sharded table was NOT created with name "test_<shard_id>"
+
+  @mysql
+  Scenario: Apply TRX_SHARD migration on MySQL in batches
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES (<shard_id>);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+    And sharded table with name "test_<shard_id>" is NOT empty
+
+  @postgres
+  Scenario: Statement ending with comment is batched on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      CREATE INDEX test_<shard_id>_id_idx ON test_<shard_id> (id) -- no semicolon
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "succeeded"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_<shard_id>_id_idx"
+
+  @mysql
+  Scenario: Statement ending with comment is batched on MySQL
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      CREATE INDEX test_<shard_id>_id_idx ON test_<shard_id> (id) -- no semicolon
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "succeeded"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_<shard_id>_id_idx"
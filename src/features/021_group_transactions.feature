@@ -0,0 +1,84 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Consecutive TRX migrations in one transaction
+  @postgres
+  Scenario: Apply grouped TRX migrations on PostgreSQL
+    Given migration dir
+    And migrations
+      | file                               | code                                    |
+      | V0000__TRX_PLAIN__test.sql         | CREATE TABLE test (id bigint);          |
+      | V0001__TRX_SHARD__test.sql         | CREATE TABLE test_<shard_id> (id bigint); |
+      | V0002__NOTRX_SHARD__test_idx.sql   | CREATE INDEX CONCURRENTLY test_id_<shard_id>_idx ON test_<shard_id> (id); |
+      | V0003__TRX_PLAIN__test_trx.sql     | CREATE TABLE test_trx (id bigint);      |
+      | V0004__TRX_PLAIN__test_data.sql    | INSERT INTO test_trx VALUES (1);        |
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --group-transactions --max-group-size 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+    And sharded index was created with name "test_id_<shard_id>_idx"
+    And plain table with name "test_trx" is NOT empty
+
+  @postgres
+  Scenario: Failed migration rolls back the whole group
+    Given migration dir
+    And migrations
+      | file                               | code                                    |
+      | V0000__TRX_PLAIN__test.sql         | CREATE TABLE test (id bigint);          |
+      | V0001__TRX_PLAIN__broken.sql       | SELECT * FROM table_does_not_exist;     |
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --group-transactions
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Unable to apply migration V0001__TRX_PLAIN__broken.sql
+    And plain table was NOT created with name "test"
+
+  @mysql
+  Scenario: TRX migrations are not grouped on MySQL
+    Given migration dir
+    And migrations
+      | file                               | code                                    |
+      | V0000__TRX_PLAIN__test.sql         | CREATE TABLE test (id bigint);          |
+      | V0001__TRX_PLAIN__test_data.sql    | INSERT INTO test VALUES (1);            |
+      | V0002__TRX_SHARD__test.sql         | CREATE TABLE test_<shard_id> (id bigint); |
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --group-transactions
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
+    And sharded table was created with name "test_<shard_id>"
+
+  @mysql
+  Scenario: Migrations before the failed one are recorded on MySQL
+    Given migration dir
+    And migrations
+      | file                               | code                                    |
+      | V0000__TRX_PLAIN__test.sql         | CREATE TABLE test (id bigint);          |
+      | V0001__TRX_PLAIN__broken.sql       | SELECT * FROM table_does_not_exist;     |
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --group-transactions
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Unable to apply migration V0001__TRX_PLAIN__broken.sql
+    And plain table was created with name "test"
+    Given add migration V0001__TRX_PLAIN__broken.sql
+      """
+      INSERT INTO test VALUES (1);
+      """
+    And successful sdbmigrate.py run with args --group-transactions
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
@@ -0,0 +1,56 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Read-only status action
+  @postgres
+  Scenario: Status of PostgreSQL databases
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --action status
+    Then sdbmigrate.py status has 1 pending migrations on every database
+    And plain table was NOT created with name "_sdbmigrate_migrations"
+    Given successful sdbmigrate.py run with defaults
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      """
+    And add migration V0002__NOTRX_PLAIN__test.sql
+      """
+      SELECT 1;
+      """
+    And successful sdbmigrate.py run with args --action status
+    Then sdbmigrate.py status has 2 pending migrations on every database
+    And sharded table was NOT created with name "test_<shard_id>"
+
+  @mysql
+  Scenario: Status of MySQL databases
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    And add migration V0001__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_2 (id bigint);
+      """
+    And successful sdbmigrate.py run with args --action status
+    Then sdbmigrate.py status has 1 pending migrations on every database
+    And plain table was NOT created with name "test_2"
@@ -0,0 +1,80 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Timing report
+  @postgres
+  Scenario: Timing report for PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      SELECT * FROM test WHERE name LIKE 'test%';
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (name text);
+      SELECT * FROM test_<shard_id> WHERE name LIKE 'test%';
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --timing-report tmp/timing_report.json
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And timing report "tmp/timing_report.json" has migration "V0001__NOTRX_SHARD__test.sql" on every database
+
+  @mysql
+  Scenario: Timing report for MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      SELECT * FROM test WHERE name LIKE 'test%';
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --timing-report tmp/timing_report.json
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And timing report "tmp/timing_report.json" has migration "V0000__TRX_PLAIN__base.sql" on every database
+
+  @mysql
+  Scenario: Percent sign is escaped as in migrations without timing report on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      INSERT INTO test VALUES (1, '100%%');
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --timing-report /tmp/sdbmigrate_timing.json
+    Then sdbmigrate.py "succeeded"
+    And plain table with name "test" has name values "100%"
+
+  @postgres
+  Scenario: Percent sign is escaped only outside of transaction on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      INSERT INTO test VALUES (1, '100%');
+      """
+    And add migration V0001__NOTRX_PLAIN__test.sql
+      """
+      INSERT INTO test VALUES (2, '200%%');
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --timing-report /tmp/sdbmigrate_timing.json
+    Then sdbmigrate.py "succeeded"
+    And plain table with name "test" has name values "100%,200%"
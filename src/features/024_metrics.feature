@@ -0,0 +1,45 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Metrics
+  @postgres
+  Scenario: Metrics file for PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (name text);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --metrics-file tmp/sdbmigrate.prom
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And metrics file "tmp/sdbmigrate.prom" has schema version 1 on every database
+
+  @mysql
+  Scenario: Metrics file for MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --metrics-file tmp/sdbmigrate.prom
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And metrics file "tmp/sdbmigrate.prom" has schema version 0 on every database
@@ -0,0 +1,113 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Resumable sharded migrations
+  @postgres
+  Scenario: Failed NOTRX_SHARD migration is continued from unfinished shard on PostgreSQL
+    Given migration dir
+    And add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      if shard_id % 8 == 5:
+          raise Exception("test failure on shard {}".format(shard_id))
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py failed with test failure on shard 5
+    Given add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+
+  @postgres
+  Scenario: Shard progress is reset for NOTRX_SHARD migration on PostgreSQL
+    Given migration dir
+    And add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      if shard_id % 8 == 5:
+          raise Exception("test failure on shard {}".format(shard_id))
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py failed with test failure on shard 5
+    Given add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And failed sdbmigrate.py run with args --reset-shard-progress 0
+    Then sdbmigrate.py failed with already exists
+
+  @mysql
+  Scenario: Failed NOTRX_SHARD migration is continued from unfinished shard on MySQL
+    Given migration dir
+    And add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      if shard_id % 8 == 5:
+          raise Exception("test failure on shard {}".format(shard_id))
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py failed with test failure on shard 5
+    Given add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+
+  @mysql
+  Scenario: Shard progress is reset for NOTRX_SHARD migration on MySQL
+    Given migration dir
+    And add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      if shard_id % 8 == 5:
+          raise Exception("test failure on shard {}".format(shard_id))
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py failed with test failure on shard 5
+    Given add migration V0000__NOTRX_SHARD__test.py
+      """
+      global cursor
+      global shard_id
+      cursor.execute("CREATE TABLE test_{} (id bigint)".format(shard_id))
+      """
+    And failed sdbmigrate.py run with args --reset-shard-progress 0
+    Then sdbmigrate.py failed with already exists
@@ -0,0 +1,107 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Lock timeout
+  @postgres
+  Scenario: Lock timeout is set for TRX and NOTRX migrations on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.py
+      """
+      global cursor
+      cursor.execute("SHOW lock_timeout")
+      assert cursor.fetchone()[0] == "2s", "Unexpected lock_timeout"
+      cursor.execute("CREATE TABLE test (id bigint)")
+      """
+    And add migration V0001__NOTRX_PLAIN__test_notrx.py
+      """
+      global cursor
+      cursor.execute("SHOW lock_timeout")
+      assert cursor.fetchone()[0] == "2s", "Unexpected lock_timeout"
+      cursor.execute("CREATE TABLE test_notrx (id bigint)")
+      """
+    And postgres_lock_timeout.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --lock-retries 2 --lock-retry-delay 0.1
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+    And plain table was created with name "test_notrx"
+
+  @mysql
+  Scenario: Lock timeout is set for TRX and NOTRX migrations on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.py
+      """
+      global cursor
+      cursor.execute("SELECT @@SESSION.lock_wait_timeout, @@SESSION.innodb_lock_wait_timeout")
+      assert tuple(cursor.fetchone()) == (2, 2), "Unexpected lock wait timeouts"
+      cursor.execute("CREATE TABLE test (id bigint)")
+      """
+    And add migration V0001__NOTRX_PLAIN__test_notrx.py
+      """
+      global cursor
+      cursor.execute("SELECT @@SESSION.lock_wait_timeout, @@SESSION.innodb_lock_wait_timeout")
+      assert tuple(cursor.fetchone()) == (2, 2), "Unexpected lock wait timeouts"
+      cursor.execute("CREATE TABLE test_notrx (id bigint)")
+      """
+    And mysql_lock_timeout.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --lock-retries 2 --lock-retry-delay 0.1
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+    And plain table was created with name "test_notrx"
+
+  @postgres
+  Scenario: TRX migration is retried after lock timeout and fails on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__alter_locked.sql
+      """
+      ALTER TABLE locked ADD COLUMN name varchar(64);
+      """
+    And postgres_lock_timeout.yaml config
+    And init databases
+    And table "locked" is locked by other transaction
+    And failed sdbmigrate.py run with args --lock-retries 1 --lock-retry-delay 0.1
+    Then sdbmigrate.py failed with retry 1 of 1 in
+    And sdbmigrate.py failed with 1 retries after lock timeout
+    And sdbmigrate.py failed with canceling statement due to lock timeout
+
+  @mysql
+  Scenario: Statement of TRX migration is retried after lock timeout and fails on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__alter_locked.sql
+      """
+      ALTER TABLE locked ADD COLUMN name varchar(64);
+      """
+    And mysql_lock_timeout.yaml config
+    And init databases
+    And table "locked" is locked by other transaction
+    And failed sdbmigrate.py run with args --lock-retries 1 --lock-retry-delay 0.1
+    Then sdbmigrate.py failed with retry 1 of 1 in
+    And sdbmigrate.py failed with 1 retries after lock timeout
+    And sdbmigrate.py failed with Lock wait timeout exceeded
+
+  @postgres
+  Scenario: CREATE INDEX CONCURRENTLY is not retried after lock timeout on PostgreSQL
+    Given migration dir
+    And add migration V0000__NOTRX_PLAIN__index_locked.sql
+      """
+      CREATE INDEX CONCURRENTLY IF NOT EXISTS locked_id_idx ON locked (id);
+      """
+    And postgres_lock_timeout.yaml config
+    And init databases
+    And table "locked" is locked by other transaction
+    And failed sdbmigrate.py run with args --lock-retries 1 --lock-retry-delay 0.1
+    Then sdbmigrate.py failed with canceling statement due to lock timeout
+    And sdbmigrate.py log has no Lock timeout on
@@ -0,0 +1,71 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Per-host concurrency limit
+  @postgres
+  Scenario: Concurrent apply limited per server on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (name text);
+      """
+    And add migration V0002__TRX_PLAIN__run_interval.py
+      """
+      import time
+      global cursor
+      cursor.execute("CREATE TABLE run_interval (started double precision, finished double precision)")
+      started = time.time()
+      time.sleep(1)
+      cursor.execute("INSERT INTO run_interval VALUES (%s, %s)", (started, time.time()))
+      """
+    And postgres_per_host.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And migrations "run_interval" ran on at most 1 database of server at once
+
+  @mysql
+  Scenario: Concurrent apply limited per server on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (name text);
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (name text);
+      """
+    And add migration V0002__TRX_PLAIN__run_interval.py
+      """
+      import time
+      global cursor
+      cursor.execute("CREATE TABLE run_interval (started double precision, finished double precision)")
+      started = time.time()
+      time.sleep(1)
+      cursor.execute("INSERT INTO run_interval VALUES (%s, %s)", (started, time.time()))
+      """
+    And mysql_per_host.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And migrations "run_interval" ran on at most 1 database of server at once
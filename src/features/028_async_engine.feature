@@ -0,0 +1,76 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Asyncio execution engine
+  @postgres
+  Scenario: Apply migrations with asyncio engine on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      """
+    And add migration V0002__NOTRX_SHARD__test_idx.sql
+      """
+      CREATE INDEX CONCURRENTLY test_id_<shard_id>_idx ON test_<shard_id> (id);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --engine asyncio --async-workers 4 --jobs 2 --shard-jobs 4
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct auto sharding
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_id_<shard_id>_idx"
+
+  @postgres
+  Scenario: Failed shard stops migration with asyncio engine
+    Given migration dir
+    And add migration V0000__NOTRX_SHARD__test_idx.sql
+      """
+      CREATE INDEX CONCURRENTLY test_id_<shard_id>_idx ON test_does_not_exist_<shard_id> (id);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --engine asyncio --shard-jobs 4
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Unable to apply migration V0000__NOTRX_SHARD__test_idx.sql to shard
+
+  @mysql
+  Scenario: Apply migrations with asyncio engine on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      """
+    And add migration V0002__NOTRX_SHARD__test_idx.sql
+      """
+      CREATE INDEX test_id_<shard_id>_idx ON test_<shard_id> (id);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --engine asyncio --async-workers 4 --jobs 2 --shard-jobs 4
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct auto sharding
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_id_<shard_id>_idx"
@@ -0,0 +1,60 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Built-in SQL splitter
+  Scenario: Built-in splitter gives the same statements as sqlparse on feature migrations
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__tricky.sql
+      """
+      SELECT 'a;b', "c;d"; -- comment; with semicolon
+      /* block; comment */ SELECT $tag$ ; $tag$;
+      CREATE PROCEDURE test_proc() BEGIN IF 1 THEN SELECT 1; END IF; SELECT 2; END;
+      """
+    Then SQL splitters give the same statements for migrations of "features/*.feature"
+
+  @postgres
+  Scenario: Apply function with sqlparse splitter
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__procedures.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      CREATE OR REPLACE FUNCTION test_count() RETURNS bigint AS $$
+      BEGIN
+        RETURN (SELECT count(*) FROM test);
+      END;
+      $$ LANGUAGE plpgsql;
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --sql-splitter sqlparse
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
+
+  @mysql
+  Scenario: Apply procedure with DELIMITER on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__procedures.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      DELIMITER //
+      CREATE PROCEDURE test_count() BEGIN SELECT count(*) FROM test; END//
+      DELIMITER ;
+      CALL test_count();
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test"
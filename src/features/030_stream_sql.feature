@@ -0,0 +1,49 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Streaming of large SQL migrations
+  @postgres
+  Scenario: Apply large PLAIN migration statement by statement on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add large migration V0001__TRX_PLAIN__seed.sql with 30000 copies of statement
+      """
+      INSERT INTO test VALUES (<region_id>, 'seed; data');
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --stream-sql-min-size 1
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
+
+  @mysql
+  Scenario: Apply large PLAIN migration statement by statement on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add large migration V0001__TRX_PLAIN__seed.sql with 30000 copies of statement
+      """
+      INSERT INTO test VALUES (<region_id>, 'seed; data');
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --stream-sql-min-size 1
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
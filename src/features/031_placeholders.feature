@@ -0,0 +1,70 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Placeholders of SQL migrations
+  @postgres
+  Scenario: Unknown placeholder is kept as is on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint DEFAULT <region_id>, html text DEFAULT '<br>');
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+
+  @postgres
+  Scenario: Unknown placeholder fails migration with --strict-placeholders on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint DEFAULT <region_idd>);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --strict-placeholders
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Migration V0000__TRX_SHARD__test.sql has unknown placeholders
+    And sharded table was NOT created with name "test_<shard_id>"
+
+  @mysql
+  Scenario: Unknown placeholder fails migration with --strict-placeholders on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint DEFAULT <region_idd>);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --strict-placeholders
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Migration V0000__TRX_PLAIN__test.sql has unknown placeholders
+    And plain table was NOT created with name "test"
+
+  @postgres
+  Scenario: Env keys which are not names and placeholders in env values are substituted on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS <table_prefix>_<region-name> (id bigint DEFAULT <region_id>);
+      """
+    And postgres_legacy_env_keys.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct env
+    And plain table was created with name "test_eu"
@@ -0,0 +1,172 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: CSV data migrations
+  @postgres
+  Scenario: Load CSV data by COPY on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint, name text);
+      """
+    And add migration V0002__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      1,"comma, inside"
+      2,"quote "" inside"
+      """
+    And add migration V0003__NOTRX_SHARD__test_data.csv
+      """
+      # table: test_<shard_id>
+      id,name
+      1,region
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --shard-jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
+    And sharded table with name "test_<shard_id>" is NOT empty
+
+  @postgres
+  Scenario: CSV migration without table fails
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test_data.csv
+      """
+      id,name
+      1,one
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with CSV migration V0000__TRX_PLAIN__test_data.csv should start with `# table: <table>` line
+
+  @mysql
+  Scenario: Load CSV data by LOAD DATA on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint, name text);
+      """
+    And add migration V0002__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      1,"comma, inside"
+      2,"quote "" inside"
+      """
+    And add migration V0003__TRX_SHARD__test_data.csv
+      """
+      # table: test_<shard_id>
+      id,name
+      1,shard
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table with name "test" is NOT empty
+    And sharded table with name "test_<shard_id>" is NOT empty
+
+  @postgres
+  Scenario: Load CSV data with CRLF line endings on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add CRLF migration V0001__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      1,one
+      2,two
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And plain table with name "test" has name values "one,two"
+
+  @mysql
+  Scenario: Load CSV data with CRLF line endings on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add CRLF migration V0001__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      1,one
+      2,two
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And plain table with name "test" has name values "one,two"
+
+  @mysql
+  Scenario: CSV migration with invalid rows fails on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint PRIMARY KEY, name text);
+      """
+    And add migration V0001__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      1,one
+      1,duplicate
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with CSV migration V0001__TRX_PLAIN__test_data.csv has invalid rows
+    And plain table with name "test" is empty
+
+  @mysql
+  Scenario: CSV migration with invalid values fails on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__base.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, name text);
+      """
+    And add migration V0001__TRX_PLAIN__test_data.csv
+      """
+      # table: test
+      id,name
+      one,one
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with CSV migration V0001__TRX_PLAIN__test_data.csv has invalid rows
+    And plain table with name "test" is empty
@@ -0,0 +1,87 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Checksums of applied migrations
+  @postgres
+  Scenario: Changed applied migration fails next run on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --manifest /tmp/sdbmigrate_manifest.json
+    Then sdbmigrate.py "succeeded"
+    And manifest file "/tmp/sdbmigrate_manifest.json" has checksum of migration "V0000__TRX_SHARD__test.sql"
+    Given add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint, value text);
+      """
+    And add migration V0001__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And successful sdbmigrate.py run with args --action status --check-drift
+    Then sdbmigrate.py status has 1 drifted migrations on every database
+    Given failed sdbmigrate.py run with args --manifest /tmp/sdbmigrate_manifest.json
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Applied migrations were changed
+    And plain table was NOT created with name "test"
+
+  @mysql
+  Scenario: Changed applied migration is applied with --allow-drift on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And mysql_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    Given add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, value text);
+      """
+    And add migration V0001__TRX_PLAIN__test2.sql
+      """
+      CREATE TABLE IF NOT EXISTS test2 (id bigint);
+      """
+    And successful sdbmigrate.py run with args --check-drift --allow-drift
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test2"
+
+  @postgres
+  Scenario: Applied migrations are not read without --manifest and --check-drift on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And postgres_auto.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    Given add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint, value text);
+      """
+    And add migration V0001__TRX_PLAIN__test2.sql
+      """
+      CREATE TABLE IF NOT EXISTS test2 (id bigint);
+      """
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And plain table was created with name "test2"
@@ -0,0 +1,68 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: psycopg 3 driver for PostgreSQL
+  @postgres
+  Scenario: Apply migrations using psycopg 3
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      CREATE INDEX CONCURRENTLY IF NOT EXISTS test_<shard_id>_id_idx ON test_<shard_id> (id);
+      """
+    And postgres_psycopg.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And database has initialized sdbmigrate state schema
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_<shard_id>_id_idx"
+
+  @postgres
+  Scenario: Apply TRX_SHARD migration in pipeline mode using psycopg 3
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES (<shard_id>);
+      """
+    And postgres_psycopg.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+    And sharded table with name "test_<shard_id>" is NOT empty
+
+  @postgres
+  Scenario: Failed statement in pipeline is reported with its shard
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES (<shard_id>);
+      INSERT INTO test_<shard_id> VALUES ('not a number <shard_id>');
+      """
+    And postgres_psycopg.yaml config
+    And init databases
+    And failed sdbmigrate.py run with args --batch-statements 5
+    Then sdbmigrate.py "failed"
+    And sdbmigrate.py failed with Failed statement on shard 0
+    And sdbmigrate.py failed with INSERT INTO test_0 VALUES ('not a number 0')
+    And sharded table was NOT created with name "test_<shard_id>"
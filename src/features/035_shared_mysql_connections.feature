@@ -0,0 +1,59 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Connections shared by MySQL databases of the same server
+  @mysql
+  Scenario: Apply migrations to MySQL databases sharing connections
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test (id bigint);
+      """
+    And add migration V0001__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      INSERT INTO test_<shard_id> VALUES (<shard_id>);
+      """
+    And add migration V0002__NOTRX_SHARD__test.sql
+      """
+      CREATE INDEX test_<shard_id>_id_idx ON test_<shard_id> (id);
+      """
+    And mysql_shared.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --jobs 2 --shard-jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sdbmigrate state has correct auto sharding
+    And plain table was created with name "test"
+    And sharded table was created with name "test_<shard_id>"
+    And sharded table with name "test_<shard_id>" is NOT empty
+    And sharded index was created with name "test_<shard_id>_id_idx"
+
+  @mysql
+  Scenario: Apply migrations to MySQL databases sharing connections from asyncio engine
+    Given migration dir
+    And add migration V0000__TRX_SHARD__test.sql
+      """
+      CREATE TABLE IF NOT EXISTS test_<shard_id> (id bigint);
+      """
+    And add migration V0001__NOTRX_SHARD__test.sql
+      """
+      CREATE INDEX test_<shard_id>_id_idx ON test_<shard_id> (id);
+      """
+    And mysql_shared.yaml config
+    And init databases
+    And successful sdbmigrate.py run with args --engine asyncio --jobs 2 --shard-jobs 2
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And sharded table was created with name "test_<shard_id>"
+    And sharded index was created with name "test_<shard_id>_id_idx"
@@ -0,0 +1,71 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+Feature: Applied migrations are not read, pending ones are read before applying
+  @postgres
+  Scenario: Corrupted applied migration doesn't fail next run on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE test (id bigint);
+      """
+    And postgres_simple.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Given corrupt migration V0000__TRX_PLAIN__test.sql
+    And add migration V0001__TRX_PLAIN__test2.sql
+      """
+      CREATE TABLE test2 (id bigint);
+      """
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test2"
+
+  @mysql
+  Scenario: Corrupted applied migration doesn't fail next run on MySQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE test (id bigint);
+      """
+    And mysql_simple.yaml config
+    And init databases
+    And successful sdbmigrate.py run with defaults
+    Given corrupt migration V0000__TRX_PLAIN__test.sql
+    And add migration V0001__TRX_PLAIN__test2.sql
+      """
+      CREATE TABLE test2 (id bigint);
+      """
+    And successful sdbmigrate.py run with defaults
+    Then sdbmigrate.py "succeeded"
+    And sdbmigrate state has correct migrations
+    And plain table was created with name "test2"
+
+  @postgres
+  Scenario: Corrupted pending migration fails run before anything is applied on PostgreSQL
+    Given migration dir
+    And add migration V0000__TRX_PLAIN__test.sql
+      """
+      CREATE TABLE test (id bigint);
+      """
+    And add migration V0001__TRX_PLAIN__test2.sql
+      """
+      CREATE TABLE test2 (id bigint);
+      """
+    And corrupt migration V0001__TRX_PLAIN__test2.sql
+    And postgres_simple.yaml config
+    And init databases
+    And failed sdbmigrate.py run with defaults
+    Then sdbmigrate.py failed with UnicodeDecodeError
+    And plain table was NOT created with name "test"
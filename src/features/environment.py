@@ -22,6 +22,13 @@ def before_scenario(context, scenario):
         pass
 
 
+def after_scenario(context, scenario):
+    # release locks of other transactions taken by scenario
+    for connection in getattr(context, "lock_connections", []):
+        connection.close()
+    context.lock_connections = []
+
+
 def after_all(context):
     try:
         shutil.rmtree(context.migration_dir)
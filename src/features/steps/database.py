@@ -92,6 +92,43 @@ def init_mysql_databases(context):
     context.databases.update(databases)
 
 
+@given('table "{table_name}" is locked by other transaction')  # noqa
+def step_impl(context, table_name):
+    """Create table and keep it locked by open transaction till the end of scenario"""
+    context.lock_connections = []
+    for db in context.databases.values():
+        db_info = db["db_info"]
+        if db_info["type"] == "postgres":
+            import psycopg2
+
+            connection = psycopg2.connect(
+                host=db_info["host"],
+                port=db_info["port"],
+                dbname=db_info["name"],
+                user=db_info["user"],
+                password=db_info["password"],
+            )
+            lock_sql = "LOCK TABLE {} IN ACCESS EXCLUSIVE MODE".format(table_name)
+        else:
+            from MySQLdb import Connection
+
+            connection = Connection(
+                host=db_info["host"],
+                port=db_info["port"],
+                user=db_info["user"],
+                passwd=db_info["password"],
+                db=db_info["name"],
+            )
+            # metadata lock of table is held by transaction which read it
+            lock_sql = "SELECT * FROM {}".format(table_name)
+        cur = connection.cursor()
+        cur.execute("CREATE TABLE {} (id bigint)".format(table_name))
+        connection.commit()
+        cur.execute(lock_sql)
+        cur.fetchall()
+        context.lock_connections.append(connection)
+
+
 class MysqlConnectionWrapper:
     def __init__(self, connection, autocommit=False):
         self._connection = connection
@@ -34,3 +34,29 @@ def step_impl(context, name):
     code = context.text.strip()
     with open(path, "w") as f:
         f.write(code.replace("\\n", "\n"))
+
+
+@given("add large migration {name} with {count:d} copies of statement")  # noqa
+def step_impl(context, name, count):
+    path = os.path.join(context.migration_dir, name)
+    statement = context.text.strip() + "\n"
+    with open(path, "w") as f:
+        for _ in range(count):
+            f.write(statement)
+
+
+@given("add CRLF migration {name}")  # noqa
+def step_impl(context, name):
+    path = os.path.join(context.migration_dir, name)
+    code = context.text.strip()
+    # newline="" keeps \r\n as is, it's line terminator of csv module by default
+    with open(path, "w", newline="") as f:
+        f.write(code.replace("\n", "\r\n") + "\r\n")
+
+
+@given("corrupt migration {name}")  # noqa
+def step_impl(context, name):
+    path = os.path.join(context.migration_dir, name)
+    # not valid UTF-8, so reading of migration fails
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfe corrupted migration\n")
@@ -111,6 +111,38 @@ def step_impl(context, table_name):
     for_each_database(context, f)
 
 
+@then('plain table with name "{table_name}" has {column} values "{values}"')
+def step_impl(context, table_name, column, values):
+    def f(_context, _db_info, cur):
+        cur.execute("SELECT {column} FROM {table_name} ORDER BY {column}".format(
+            column=column, table_name=table_name
+        ))
+        actual = [row[0] for row in cur.fetchall()]
+        assert actual == values.split(","), "Table {} has {} values {}".format(table_name, column, actual)
+
+    for_each_database(context, f)
+
+
+@then('migrations "{table_name}" ran on at most {count:d} database of server at once')
+def step_impl(context, table_name, count):
+    """Table has started and finished time of migration, all databases are on the same server"""
+    intervals = []
+
+    def f(_context, _db_info, cur):
+        cur.execute("SELECT started, finished FROM {}".format(table_name))
+        intervals.extend(cur.fetchall())
+
+    for_each_database(context, f)
+    events = sorted(
+        [(started, 1) for started, _ in intervals] + [(finished, -1) for _, finished in intervals]
+    )
+    running = max_running = 0
+    for _, change in events:
+        running += change
+        max_running = max(max_running, running)
+    assert max_running <= count, "Migrations ran on {} databases at once".format(max_running)
+
+
 @then('sharded table with name "{table_name}" is empty')
 def step_impl(context, table_name):
     def f(shard_id, cur):
@@ -11,6 +11,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import ast
+import glob
+import json
 import logging
 import os
 import sys
@@ -97,6 +100,12 @@ def step_impl(context):
     context.last_migrate_res = {"ret": res[0], "out": res[1], "err": res[2]}
 
 
+@given("failed sdbmigrate.py run with args {args}")
+def step_impl(context, args):
+    res = run_sdbmigrate(context, args=args)
+    context.last_migrate_res = {"ret": res[0], "out": res[1], "err": res[2]}
+
+
 @then('sdbmigrate.py "{result}"')  # noqa
 def step_impl(context, result):
     if not context.last_migrate_res:
@@ -125,3 +134,77 @@ def step_impl(context, error):
         sys.stdout.write(str(context.last_migrate_res["out"]))
         sys.stderr.write(str(context.last_migrate_res["err"]))
         raise Exception("sdbmigrate.py is failed with other error, expected `{}`".format(error))
+
+
+@then("sdbmigrate.py log contains {text}")
+def step_impl(context, text):
+    if text not in context.last_migrate_res["err"]:
+        sys.stderr.write(str(context.last_migrate_res["err"]))
+        raise Exception("sdbmigrate.py log has no `{}`".format(text))
+
+
+@then("sdbmigrate.py log has no {text}")
+def step_impl(context, text):
+    if text in context.last_migrate_res["err"]:
+        sys.stderr.write(str(context.last_migrate_res["err"]))
+        raise Exception("sdbmigrate.py log has `{}`".format(text))
+
+
+@then("sdbmigrate.py status has {count:d} pending migrations on every database")
+def step_impl(context, count):
+    stdout = ast.literal_eval(context.last_migrate_res["out"]).decode("utf8")
+    report = json.loads(stdout)
+    assert len(report["databases"]) == len(context.sdbmigrate_config["databases"])
+    for db_status in report["databases"]:
+        assert len(db_status["pending"]) == count, "Unexpected status of {}: {}".format(
+            db_status["name"], db_status
+        )
+
+
+@then('timing report "{path}" has migration "{migration_name}" on every database')
+def step_impl(context, path, migration_name):
+    with open(path) as f:
+        report = json.load(f)
+    assert report["statement_count"] > 0, "No statements in timing report"
+    assert len(report["databases"]) == len(context.sdbmigrate_config["databases"])
+    for db_name, db_report in report["databases"].items():
+        migrations = [record["migration"] for record in db_report["slowest_migrations"]]
+        assert migration_name in migrations, "No {} for {} in timing report".format(migration_name, db_name)
+
+
+@then('metrics file "{path}" has schema version {version:d} on every database')
+def step_impl(context, path, version):
+    with open(path) as f:
+        metrics = f.read().splitlines()
+    schema_versions = [line for line in metrics if line.startswith("sdbmigrate_schema_version{")]
+    assert len(schema_versions) == len(context.sdbmigrate_config["databases"]), metrics
+    for line in schema_versions:
+        assert line.endswith(" {}".format(version)), "Unexpected schema version: {}".format(line)
+    assert any(line.startswith("sdbmigrate_statements_total{") for line in metrics), metrics
+
+
+@then("sdbmigrate.py status has {count:d} drifted migrations on every database")
+def step_impl(context, count):
+    stdout = ast.literal_eval(context.last_migrate_res["out"]).decode("utf8")
+    report = json.loads(stdout)
+    assert len(report["databases"]) == len(context.sdbmigrate_config["databases"])
+    for db_status in report["databases"]:
+        assert len(db_status["drifted"]) == count, "Unexpected status of {}: {}".format(
+            db_status["name"], db_status
+        )
+
+
+@given("parse cache {path} has entries of wrong shape")
+def step_impl(context, path):
+    for entry_path in glob.glob(os.path.join(path, "*.json")):
+        with open(entry_path, "w") as f:
+            json.dump({"statements": 5}, f)
+
+
+@then('manifest file "{path}" has checksum of migration "{migration_name}"')
+def step_impl(context, path, migration_name):
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = {entry["name"]: entry for entry in manifest["migrations"]}
+    assert migration_name in entries, "No {} in manifest".format(migration_name)
+    assert len(entries[migration_name]["checksum"]) == 64, entries[migration_name]
@@ -32,6 +32,7 @@ def verify_sdbmigrate_state_schema(context, schema_name=None):
         "_sdbmigrate_migrations",
         "_sdbmigrate_sharding_state",
         "_sdbmigrate_env",
+        "_sdbmigrate_shard_progress",
     ]
     for db_info in context.databases.values():
         with db_info["conn"] as conn:
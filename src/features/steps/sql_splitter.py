@@ -0,0 +1,64 @@
+# Copyright 2022 Wargaming Group Limited
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import glob
+import importlib.util
+
+from behave import then
+from behave.parser import parse_file
+
+SDBMIGRATE_PATH = "./bin/sdbmigrate.py"
+
+
+def load_sdbmigrate():
+    """bin/sdbmigrate.py is a script, not a package, so it's loaded by path"""
+    spec = importlib.util.spec_from_file_location("sdbmigrate", SDBMIGRATE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_feature_sql_migrations(pattern):
+    """Yield (feature path, migration name, code) of SQL migrations added by features,
+    both by "add migration" doc strings and by "migrations" tables.
+    Code is the same as written into migration file by these steps.
+    """
+    for path in sorted(glob.glob(pattern)):
+        for scenario in parse_file(path).walk_scenarios():
+            for step in scenario.all_steps:
+                if step.name.startswith("add migration ") and step.name.endswith(".sql") and step.text:
+                    code = step.text.strip()
+                    yield path, step.name[len("add migration "):], code.replace("\\n", "\n")
+                elif step.name == "migrations" and step.table:
+                    for row in step.table:
+                        if not row["file"].endswith(".sql"):
+                            continue
+                        code = row["code"]
+                        if step.text:
+                            code = code.replace("%context.text%", step.text.strip())
+                        yield path, row["file"], code.replace("\\n", "\n")
+
+
+@then('SQL splitters give the same statements for migrations of "{pattern}"')
+def step_impl(context, pattern):
+    sdbmigrate = load_sdbmigrate()
+    checked = 0
+    for path, name, code in get_feature_sql_migrations(pattern):
+        if "DELIMITER" in code:
+            # sqlparse doesn't support MySQL client commands
+            continue
+        builtin = sdbmigrate.split_sql(code, splitter=sdbmigrate.SQL_SPLITTER_BUILTIN)
+        expected = sdbmigrate.split_sql(code, splitter=sdbmigrate.SQL_SPLITTER_SQLPARSE)
+        assert builtin == expected, "{} of {}: {} != {}".format(name, path, builtin, expected)
+        checked += 1
+    assert checked > 0, "No SQL migrations in {}".format(pattern)
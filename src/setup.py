@@ -13,6 +13,7 @@ setup(
     packages=[''],
     extras_require={
         "postgres": ["psycopg2 >= 2.9.3"],
+        "psycopg": ["psycopg >= 3.1"],
         "mysql": ["mysqlclient"],
     },
     scripts=["bin/sdbmigrate.py"],